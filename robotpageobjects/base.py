@@ -2,19 +2,64 @@ from Selenium2Library.keywords import _browsermanagement
 import re
 import importlib
 import inspect
+import time
 import warnings
 
+import robot.utils
 from robot.utils import asserts
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, UnexpectedAlertPresentException
 from selenium.webdriver.remote.webelement import WebElement
 from Selenium2Library import Selenium2Library
 from Selenium2Library.keywords.keywordgroup import KeywordGroupMetaClass
 
 from . import abstractedlogger
+from . import conditions
+from .componentcollection import ComponentCollection
+from .connectionpool import is_concurrent
+from .domcache import DomLocatorCache
 from . import exceptions
+from . import jslocators
 from .context import Context
 from .optionhandler import OptionHandler
+from .waitstats import WaitStats
+
+
+# Installs hooks recording uncaught JavaScript errors and 5xx responses to XHR and
+# fetch requests (once per document), then returns and clears what was recorded.
+_BROWSER_ERROR_SENTINEL = """function() {
+    if (!window.__rpoErrors) {
+        var errors = window.__rpoErrors = [];
+        var oldOnError = window.onerror;
+        window.onerror = function(msg, src, line) {
+            errors.push("JavaScript error: " + msg + " (" + src + ":" + line + ")");
+            return oldOnError ? oldOnError.apply(this, arguments) : false;
+        };
+        var open = XMLHttpRequest.prototype.open, send = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.open = function(method, url) {
+            this.__rpoRequest = method + " " + url;
+            return open.apply(this, arguments);
+        };
+        XMLHttpRequest.prototype.send = function() {
+            var xhr = this;
+            xhr.addEventListener("load", function() {
+                if (xhr.status >= 500) { errors.push("HTTP " + xhr.status + " response to " + xhr.__rpoRequest); }
+            });
+            return send.apply(this, arguments);
+        };
+        if (window.fetch) {
+            var fetch = window.fetch;
+            window.fetch = function(input) {
+                return fetch.apply(this, arguments).then(function(response) {
+                    if (response.status >= 500) { errors.push("HTTP " + response.status + " response to " + (input.url || input)); }
+                    return response;
+                });
+            };
+        }
+    }
+    return window.__rpoErrors.splice(0, window.__rpoErrors.length);
+}"""
 
 
 class _Keywords(object):
@@ -323,8 +368,11 @@ class _ComponentsManagerMeta(KeywordGroupMetaClass):
             all_components = ComponentsDict()
             own_components = cdict.get("components", {})
 
-            # Get all the components dicts defined by the bases
-            base_dicts = [get_components(base.__dict__, base.__bases__) for base in cbases if hasattr(base, "components")]
+            # Get all the components dicts defined by the bases. Bases created by this metaclass
+            # already have their merged components, so only other classes need merging.
+            base_dicts = [base.__dict__["_merged_components"] if "_merged_components" in base.__dict__
+                          else get_components(base.__dict__, base.__bases__)
+                          for base in cbases if hasattr(base, "components")]
 
             # Add the components for the bases to the return dict
             [all_components.merge(base_dict) for base_dict in base_dicts]
@@ -343,7 +391,7 @@ class _ComponentsManagerMeta(KeywordGroupMetaClass):
             """
             Create closure to avoid changing value of component_class
             """
-            return lambda self: self.get_instances(klass)
+            return lambda self: self.get_collection(klass)
 
         def mkfnc_singular(klass):
             """
@@ -352,6 +400,7 @@ class _ComponentsManagerMeta(KeywordGroupMetaClass):
             return lambda self: self.get_instance(klass)
 
         classdict["components"] = components
+        classdict["_merged_components"] = components
 
         for component_class in components:
             # Loop through components for this class. Normalize each component name,
@@ -388,14 +437,13 @@ class _ComponentsManager(object):
 
         :param component_class: The page component class
         """
+        locator = self._get_component_locator(component_class)
 
-        els = self.get_instances(component_class)
-        try:
-            ret = els[0]
-        except KeyError:
-            ret = None
-
-        return ret
+        # Only the first reference element is wanted, so don't build a component for every match.
+        reference_webelement = self._element_find(locator, True, False)
+        if reference_webelement is None:
+            return None
+        return self._make_component(component_class, reference_webelement, locator, 0)
 
     @not_keyword
     def get_instances(self, component_class):
@@ -406,12 +454,91 @@ class _ComponentsManager(object):
 
         :param component_class: The page component class
         """
+        locator = self._get_component_locator(component_class)
+        reference_elements = self._find_component_reference_elements(locator)
+        return [self._make_component(component_class, reference_webelement, locator, index)
+                for index, reference_webelement in enumerate(reference_elements)]
+
+    @not_keyword
+    def get_collection(self, component_class):
+        """ Gets a page component's instances as a lazy sequence.
+        Components are only built when they're indexed or iterated over,
+        and len() counts the reference elements without building any.
+        See `robotpageobjects.componentcollection.ComponentCollection`.
+
+        :param component_class: The page component class
+        :returns: ComponentCollection
+        """
+        return ComponentCollection(self, component_class, self._get_component_locator(component_class))
+
+    def _find_component_reference_elements(self, locator, required=True):
+        """
+        Finds reference elements for building components, remembering them
+        so stale components can be refreshed. See `_get_fresh_reference_elements`.
+        :param required: Whether to raise ValueError if nothing matches, rather than return an empty list
+        """
         try:
-            return [component_class(reference_webelement) for reference_webelement in
-                self.get_reference_elements(self.components[component_class])]
+            reference_elements = self.get_reference_elements(locator)
+        except ValueError:
+            if required:
+                raise
+            reference_elements = []
+        self._get_reference_elements_cache()[locator] = reference_elements
+        return reference_elements
+
+    def _count_elements(self, locator):
+        """
+        Counts the elements matching a locator with one script, when the
+        locator can be evaluated in the browser. Otherwise, finds them and counts them.
+        :returns: int
+        """
+        finder = self._get_js_finder(locator)
+        if finder is None or self._get_cacheable_dom_expression(locator) is not None:
+            return len(self._element_find(locator, False, False))
+        return self._execute_on_root("return (%s)(root).length;" % finder)
+
+    def _get_component_locator(self, component_class):
+        try:
+            return self.components[component_class]
         except KeyError:
             raise exceptions.ComponentError("You tried to retrieve instances of a component not defined for this class.")
 
+    def _make_component(self, component_class, reference_webelement, locator, index):
+        """
+        Builds a component, recording how its reference element was found so
+        the component can find it again if it goes stale.
+        """
+        from_parent = getattr(component_class, "_from_parent", None)
+        if from_parent is not None:
+            component = from_parent(self, reference_webelement)
+        else:
+            component = component_class(reference_webelement)
+        component._bind_locator_chain(self, locator, index)
+        return component
+
+    def _get_reference_elements_cache(self):
+        try:
+            return self._reference_elements
+        except AttributeError:
+            self._reference_elements = {}
+            return self._reference_elements
+
+    def _get_fresh_reference_elements(self, locator, stale_element):
+        """
+        Called by components whose reference element has gone stale. The reference
+        elements are only found again if the last list we found still contains the stale
+        element, so all the components from one list share a single lookup after a re-render.
+        :param locator: The component locator
+        :param stale_element: The component's stale reference element
+        :returns: list of WebElements
+        """
+        cache = self._get_reference_elements_cache()
+        elements = cache.get(locator)
+        if elements is None or stale_element in elements:
+            elements = self.get_reference_elements(locator)
+            cache[locator] = elements
+        return elements
+
     @not_keyword
     def get_reference_elements(self, locator):
         """
@@ -483,6 +610,18 @@ class _SelectorsManager(object):
         Get the selectors from all parent classes and merge them,
         overriding any parent classes' selectors with subclasses'
         selectors.
+
+        The merged selectors are cached on the class, and each instance
+        gets its own copy.
+        """
+        klass = self.__class__
+        if "_merged_selectors" not in klass.__dict__:
+            klass._merged_selectors = self._merge_class_selectors()
+        return SelectorsDict(klass._merged_selectors)
+
+    def _merge_class_selectors(self):
+        """
+        See `_get_class_selectors`.
         """
 
         def __get_class_selectors(klass):
@@ -539,6 +678,33 @@ class _BaseActions(_S2LWrapper):
 
     _abstracted_logger = abstractedlogger.Logger()
 
+    # Instance attributes set up by Selenium2Library's and our constructors that components
+    # borrow from the page or component creating them, instead of building their own.
+    # See `robotpageobjects.component.Component._from_parent`.
+    _shared_state_attrs = (
+        "_cache",
+        "_shared_cache",
+        "_window_manager",
+        "_table_element_finder",
+        "_speed_in_secs",
+        "_timeout_in_secs",
+        "_implicit_wait_in_secs",
+        "_run_on_failure_keyword",
+        "_running_on_failure_routine",
+        "_cancel_on_next_confirmation",
+        "_screenshot_index",
+        "screenshot_root_directory",
+        "ROBOT_LIBRARY_LISTENER",
+        "_option_handler",
+        "_is_robot",
+        "selenium_speed",
+        "selenium_implicit_wait",
+        "baseurl",
+        "fail_on_browser_errors",
+        "test_time_budget",
+        "_dom_cache",
+    )
+
     def __init__(self, *args, **kwargs):
         """
         Initializes the options used by the actions defined in this class.
@@ -558,6 +724,29 @@ class _BaseActions(_S2LWrapper):
 
         self.baseurl = self._option_handler.get("baseurl")
 
+        self.fail_on_browser_errors = self._option_handler.get_bool("fail_on_browser_errors")
+
+        wait_report = self._option_handler.get("wait_report")
+        if wait_report:
+            WaitStats.enable(wait_report)
+
+        budget_opt = self._option_handler.get("test_time_budget")
+        self.test_time_budget = robot.utils.timestr_to_secs(budget_opt) if budget_opt else None
+
+        self._dom_cache = DomLocatorCache() if self._option_handler.get_bool("cache_dom_locators") else None
+
+    def _get_shared_state(self):
+        """
+        Gets the state components borrow from this page object or component.
+        See `_shared_state_attrs`.
+        :returns: dict
+        """
+        state = dict((attr, self.__dict__[attr]) for attr in self._shared_state_attrs if attr in self.__dict__)
+        state["_screenshot_path_stack"] = []
+        # Read by Selenium2Library's keyword decorator when a keyword fails.
+        state["_has_run_on_failure"] = False
+        return state
+
     def log(self, msg, level="INFO", is_console=True):
         """ Logs either to Robot log file or to a file called po_log.txt
         at the current directory.
@@ -613,6 +802,136 @@ class _BaseActions(_S2LWrapper):
         self._abstracted_logger.log(msg, page_name, level, is_console)
         return self
 
+    def set_test_time_budget(self, seconds):
+        """
+        Sets the time the current test has left to run. Every wait and element
+        lookup from then on waits for at most the remaining time, so a test that
+        can't pass fails quickly instead of sitting out each timeout in turn.
+
+        In Robot the budget applies until the end of the current test. Outside Robot it
+        applies until it is set again.
+
+        The `test_time_budget` option sets a budget for every test automatically.
+
+        :param seconds: The budget, as a number or a Robot time string such as "1 minute". Pass 0 or None
+                        to remove it, including a budget set by the `test_time_budget` option.
+        :returns: self
+        """
+        seconds = robot.utils.timestr_to_secs(seconds) if seconds not in (None, "", "None") else 0
+        # An infinite deadline, rather than none, keeps the option's budget from starting again.
+        Context.set_deadline(time.time() + seconds if seconds else float("inf"))
+        return self
+
+    def _get_test_deadline(self):
+        deadline = Context.get_deadline()
+        if deadline is None and self.test_time_budget:
+            # No budget set for this test yet, so start the default one.
+            deadline = time.time() + self.test_time_budget
+            Context.set_deadline(deadline)
+        return deadline if deadline != float("inf") else None
+
+    def _get_budgeted_timeout(self, timeout):
+        """
+        Limits `timeout` (in seconds) to the time left in the test's time budget.
+        """
+        deadline = self._get_test_deadline()
+        if deadline is None:
+            return timeout
+        return max(0, min(timeout, deadline - time.time()))
+
+    def _wait_until_no_error(self, timeout, wait_func, *args):
+        """
+        Override Selenium2Library's polling loop, used by its "Wait ..." keywords,
+        so the test time budget applies to them too.
+        """
+        timeout = robot.utils.timestr_to_secs(timeout) if timeout is not None else self._timeout_in_secs
+
+        def checked_wait_func(*args):
+            error = wait_func(*args)
+            if error is not None:
+                self._check_browser_errors()
+            return error
+
+        start = time.time()
+        succeeded = False
+        try:
+            super(_BaseActions, self)._wait_until_no_error(self._get_budgeted_timeout(timeout),
+                                                           checked_wait_func, *args)
+            succeeded = True
+        finally:
+            self._record_wait(self._describe_wait(wait_func, args), timeout, start, succeeded)
+
+    def _describe_wait(self, wait_func, args=()):
+        """
+        Describes what a wait is for, for the wait report. Selenium2Library's "Wait ..."
+        keywords poll with functions made on the fly, so this is the locator, condition or text
+        such a function closes over, or failing that, its first argument or its name.
+        """
+        code = getattr(wait_func, "__code__", None)
+        names = code.co_freevars if code is not None else ()
+        values = dict(zip(names, [cell.cell_contents for cell in getattr(wait_func, "__closure__", None) or ()]))
+        if "function" in values and "args" in values:
+            # Made by Selenium2Library's _wait_until, from a check and its arguments.
+            return self._describe_wait(values["function"], values["args"])
+        for name in ("locator", "condition", "text"):
+            if name in values:
+                return values[name]
+        return args[0] if args else getattr(wait_func, "__name__", wait_func)
+
+    def _record_wait(self, target, timeout, start, succeeded):
+        """
+        Records a wait for the wait report. See `robotpageobjects.waitstats`.
+        :param target: The selector, locator or condition waited for
+        :param timeout: The configured timeout, in seconds
+        :param start: When the wait started, as returned by time.time()
+        :param succeeded: Whether the wait succeeded
+        """
+        WaitStats.record(self.__class__.__name__, target, timeout, time.time() - start, succeeded)
+
+    def _install_browser_error_sentinel(self):
+        """
+        Starts recording browser-side errors, if the fail_on_browser_errors option is set.
+        Called when a page is opened. The hooks are also installed by the first check after
+        navigating to another document. Either way they're installed after the document has
+        loaded, so errors raised while it loads, such as by its inline scripts, aren't caught.
+        """
+        if self.fail_on_browser_errors:
+            self.driver.execute_script("(%s)();" % _BROWSER_ERROR_SENTINEL)
+
+    def _check_browser_errors(self):
+        """
+        Raises BrowserSideError if the fail_on_browser_errors option is set and
+        the page has had errors since the last check.
+        """
+        if not self.fail_on_browser_errors:
+            return
+        try:
+            errors = self.driver.execute_script("return (%s)();" % _BROWSER_ERROR_SENTINEL)
+        except UnexpectedAlertPresentException:
+            # Scripts can't run while an alert is open. The errors are picked up by the next check.
+            return
+        self._raise_browser_errors(errors)
+
+    def _raise_browser_errors(self, errors):
+        if errors:
+            raise exceptions.BrowserSideError("Stopped waiting because of errors in the browser:\n%s"
+                                              % "\n".join(errors))
+
+    def _execute_poll(self, script, *args):
+        """
+        Like `_execute_on_root`, but for scripts run on each poll of a wait. If the
+        fail_on_browser_errors option is set, browser-side errors are checked for
+        in the same call.
+        """
+        if not self.fail_on_browser_errors:
+            return self._execute_on_root(script, *args)
+        errors, ret = self._execute_on_root("var errors = (%s)();\n"
+                                            "if (errors.length) { return [errors, null]; }\n"
+                                            "return [[], (function() {\n%s\n}).apply(this, arguments)];"
+                                            % (_BROWSER_ERROR_SENTINEL, script), *args)
+        self._raise_browser_errors(errors)
+        return ret
+
     def wait_until_alert_is_present(self, timeout=None):
         alert_present = False
         self.wait_for(lambda: EC.alert_is_present(), timeout=timeout,
@@ -642,27 +961,115 @@ class _BaseActions(_S2LWrapper):
     def wait_for(self, condition, timeout=None, message=''):
         """
         Waits for a condition defined by the passed function to become True.
+
+        `condition` can also be a composed condition built with `all_of`, `any_of` and `not_`
+        from `robotpageobjects.conditions`. These are evaluated in a single round-trip to the
+        browser per poll, and if the wait times out, the message lists the unmet sub-conditions.
+
         :param condition: The condition to wait for
-        :type condition: callable
+        :type condition: callable or robotpageobjects.conditions.Condition
         :param timeout: How long to wait for the condition, defaults to the selenium implicit wait
         :type condition: number
         :param message: Message to show if the wait times out
         :type condition: string
         :returns: None
         """
-        wait = WebDriverWait(self.get_current_browser(), timeout or self.selenium_implicit_wait)
+        if isinstance(condition, conditions.Condition):
+            return self._wait_for_composed(condition, timeout, message)
+
+        timeout = timeout or self.selenium_implicit_wait
+        wait = WebDriverWait(self.get_current_browser(), self._get_budgeted_timeout(timeout))
 
         def wait_fnc(driver):
             try:
                 ret = condition()
             except AssertionError as e:
-                return False
-            else:
-                return ret
+                ret = False
+            if not ret:
+                self._check_browser_errors()
+            return ret
 
-        wait.until(wait_fnc, message)
+        start = time.time()
+        succeeded = False
+        try:
+            wait.until(wait_fnc, message)
+            succeeded = True
+        finally:
+            self._record_wait(self._describe_wait(condition), timeout, start, succeeded)
         return self
 
+    def _wait_for_composed(self, condition, timeout=None, message=''):
+        """
+        See :func:`wait_for`.
+        """
+        timeout = timeout or self.selenium_implicit_wait
+        wait = WebDriverWait(self.get_current_browser(), self._get_budgeted_timeout(timeout))
+        unmet = [condition.describe()]
+
+        def wait_fnc(driver):
+            met, unmet[:] = conditions.evaluate(condition, self)
+            return met
+
+        start = time.time()
+        succeeded = False
+        try:
+            wait.until(wait_fnc)
+            succeeded = True
+        except TimeoutException:
+            raise TimeoutException("%sCondition %s was not met after %s. Unmet: %s"
+                                   % (message + "\n" if message else "", condition.describe(),
+                                      self._format_timeout(timeout), "; ".join(unmet)))
+        finally:
+            self._record_wait(condition.describe(), timeout, start, succeeded)
+        return self
+
+    def _get_js_root(self):
+        """
+        Gets the node that relative lookups in scripts run by `_execute_on_root`
+        start from. None means the document.
+        """
+        return None
+
+    def _execute_on_root(self, script, *args):
+        """
+        Executes `script` in the browser with a `root` variable bound to the document,
+        or for components, to the reference element. Any extra arguments are
+        available to the script starting at arguments[1].
+        """
+        return self.driver.execute_script("var root = arguments[0] || document;\n" + script,
+                                          self._get_js_root(), *args)
+
+    def _get_js_finder(self, locator):
+        """
+        Gets the source of a JavaScript function that finds the elements matched by
+        a selector or locator. See `robotpageobjects.jslocators.compile_locator`.
+        :returns: str or None
+        """
+        if locator in self.selectors:
+            locator = self.resolve_selector(locator)
+        prefix, criteria = self._element_finder._parse_locator(locator)
+        return jslocators.compile_locator(prefix, criteria)
+
+    def _compile_snapshot(self, fields):
+        """
+        Gets the source of a JavaScript function extracting snapshot fields from
+        an element. See `robotpageobjects.component.Component.snapshot`.
+        :returns: str
+        """
+        if not isinstance(fields, dict):
+            fields = dict((name, name) for name in fields)
+        compiled = []
+        for name, spec in fields.iteritems():
+            locator, attribute = spec if isinstance(spec, tuple) else (spec, None)
+            finder = None
+            if locator is not None:
+                finder = self._get_js_finder(locator)
+                if finder is None:
+                    raise ValueError("Locator \"%s\" for snapshot field \"%s\" can't be evaluated in the browser."
+                                     % (locator, name))
+            compiled.append((name, finder, attribute))
+        return jslocators.compile_snapshot(compiled)
+
     @robot_alias("get_hash_on__name__")
     def get_hash(self):
         """
@@ -710,21 +1117,39 @@ class _BaseActions(_S2LWrapper):
         if isinstance(locator, WebElement):
             return locator
 
-        our_wait = self.selenium_implicit_wait if kwargs.get("wait") is None else kwargs["wait"]
+        requested_wait = self.selenium_implicit_wait if kwargs.get("wait") is None else kwargs["wait"]
+        our_wait = self._get_budgeted_timeout(requested_wait)
 
         # If wait is set, don't pass it along to the super classe's implementation, since it has none.
         if "wait" in kwargs:
             del kwargs["wait"]
 
 
-        self.driver.implicitly_wait(our_wait)
-        
+        # When watching for browser-side errors, we poll for the element ourselves
+        # instead of letting WebDriver wait for it, so we can stop early. We also poll
+        # when threads share the session (see ComponentCollection.map), since the implicit
+        # wait applies to the whole session, and is kept at 0 meanwhile.
+        concurrent = is_concurrent(self.driver)
+        poll = (self.fail_on_browser_errors or concurrent) and our_wait > 0
+        if not concurrent:
+            self.driver.implicitly_wait(0 if poll else our_wait)
 
+        target = locator
         if locator in self.selectors:
             locator = self.resolve_selector(locator)
 
+        dom_expression = self._get_cacheable_dom_expression(locator, *args, **kwargs)
+
+        start = time.time()
+        found = None
         try:
-            return super(_BaseActions, self)._element_find(locator, *args, **kwargs)
+            if dom_expression is not None:
+                found = self._find_by_cached_dom(locator, dom_expression, *args, **kwargs)
+            elif poll:
+                found = self._poll_for_elements(locator, our_wait, *args, **kwargs)
+            else:
+                found = super(_BaseActions, self)._element_find(locator, *args, **kwargs)
+            return found
         except ValueError:
             if not self._is_locator_format(locator):
                 # Not found, doesn't look like a locator, not in selectors dict
@@ -733,7 +1158,68 @@ class _BaseActions(_S2LWrapper):
             else:
                 raise
         finally:
-            self.driver.implicitly_wait(self.selenium_implicit_wait)
+            if not concurrent:
+                self.driver.implicitly_wait(self.selenium_implicit_wait)
+            if requested_wait:
+                self._record_wait(target, requested_wait, start, bool(found))
+
+    def _get_cacheable_dom_expression(self, locator, first_only=True, required=True, tag=None):
+        """
+        Gets the expression of a dom= locator whose result can come from the
+        dom= locator cache, if the cache_dom_locators option is set. Otherwise, returns None.
+        """
+        if self._dom_cache is None or tag is not None:
+            return None
+        prefix, criteria = self._element_finder._parse_locator(locator)
+        if prefix is None or prefix.strip().lower() != "dom":
+            return None
+        return criteria
+
+    def _find_by_cached_dom(self, locator, expression, first_only=True, required=True, tag=None):
+        """
+        Finds elements with a dom= locator through the dom= locator cache,
+        with the same results as Selenium2Library's `_element_find`. Takes the same
+        arguments, but `tag` is always None, since lookups filtered by tag aren't cached.
+        """
+        elements = self._dom_cache.find(self.driver, expression)
+        if required and not elements:
+            raise ValueError("Element locator '%s' did not match any elements." % locator)
+        if first_only:
+            return elements[0] if elements else None
+        return elements
+
+    @not_keyword
+    def get_dom_locator_evaluations(self):
+        """
+        Gets how many times each dom= locator expression was evaluated by this page object
+        and its components, when the cache_dom_locators option is set.
+        :returns: dict
+        """
+        return dict(self._dom_cache.evaluations) if self._dom_cache is not None else {}
+
+    def _poll_for_elements(self, locator, timeout, first_only=True, required=True, tag=None):
+        """
+        Polls for elements for up to `timeout` seconds, checking for browser-side
+        errors between attempts. When the locator can be evaluated in the browser,
+        each attempt and its check are a single script. See `_element_find`.
+        """
+        finder = self._get_js_finder(locator) if tag is None else None
+        maxtime = time.time() + timeout
+        while time.time() < maxtime:
+            if finder is not None:
+                found = self._execute_poll("return (%s)(root);" % finder)
+                if found:
+                    return found[0] if first_only else found
+            else:
+                try:
+                    found = super(_BaseActions, self)._element_find(locator, first_only, required, tag)
+                except ValueError:
+                    found = None
+                if found:
+                    return found
+                self._check_browser_errors()
+            time.sleep(0.2)
+        return super(_BaseActions, self)._element_find(locator, first_only, required, tag)
 
     @not_keyword
     def find_element(self, locator, required=True, wait=None, **kwargs):
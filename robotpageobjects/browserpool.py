@@ -0,0 +1,180 @@
+"""
+A pool of warm browser sessions, reused across suites.
+
+When the `browser_pool_size` option is set, closing a page object's browser doesn't quit
+it. The browser's state is reset (cookies, local and session storage, extra windows), it's
+pointed at about:blank, and it's kept for the next page object that opens a browser of the
+same type, so only the first suite pays for starting the browser. At most
+`browser_pool_size` idle browsers are kept. With `browser_pool_max_uses` set, a browser is
+quit instead of being reused once it has been opened that many times. Idle browsers are quit
+when the test run ends.
+
+With the `prelaunch_browser` option set, the pool also starts a browser in a background
+thread as soon as a page object is created, so the browser starts up while the rest of
+the suite setup runs, and `open` only waits for whatever startup time is left.
+"""
+import atexit
+import threading
+
+from selenium.common.exceptions import WebDriverException
+
+
+# Clears what one test might leave behind for the next. Storage isn't
+# accessible from some documents (like about:blank), hence the try.
+_RESET_STORAGE = """try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}"""
+
+
+class BrowserPool(object):
+    """
+    Keeps idle browsers by browser name, and counts how many times each
+    browser it knows about has been used.
+    """
+
+    def __init__(self, size, max_uses=None):
+        """
+        :param size: The maximum number of idle browsers to keep
+        :type size: int
+        :param max_uses: How many times a browser can be used before it's quit, or None for no limit
+        :type max_uses: int
+        """
+        self.size = size
+        self.max_uses = max_uses
+        # browser name -> list of idle browsers
+        self._idle = {}
+        # id(browser) -> [browser name, uses]
+        self._tracked = {}
+        # browser name -> (thread, result dict) of browsers being launched in the background
+        self._launching = {}
+        self._quit_at_exit = False
+
+    def _register_quit_at_exit(self):
+        if not self._quit_at_exit:
+            atexit.register(self.quit_all)
+            self._quit_at_exit = True
+
+    def track(self, browser_name, browser):
+        """
+        Starts tracking a newly created browser, so it's returned to the pool when closed.
+        """
+        self._tracked[id(browser)] = [browser_name, 1]
+        self._register_quit_at_exit()
+
+    def prelaunch(self, browser_name, factory):
+        """
+        Starts creating a browser in a background thread, unless there's already an
+        idle browser of that type or one being launched.
+        :param browser_name: The browser type
+        :param factory: A callable taking no arguments that creates the browser
+        """
+        if self._idle.get(browser_name) or self.is_launching(browser_name):
+            return
+        result = {}
+
+        def launch():
+            try:
+                result["browser"] = factory()
+            except Exception as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=launch, name="robotpageobjects-prelaunch-%s" % browser_name)
+        thread.daemon = True
+        self._launching[browser_name] = (thread, result)
+        self._register_quit_at_exit()
+        thread.start()
+
+    def is_launching(self, browser_name):
+        """
+        Tells whether a browser of the given type was prelaunched and hasn't been checked out yet.
+        """
+        return browser_name in self._launching
+
+    def _join_launch(self, browser_name):
+        """
+        Waits for a background launch to finish, and returns the browser, or None if there was
+        no launch or it failed. A failed launch isn't retried here: the caller creates a browser
+        the usual way, which raises the error again if it's not transient.
+        """
+        thread, result = self._launching.pop(browser_name, (None, None))
+        if thread is None:
+            return None
+        thread.join()
+        browser = result.get("browser")
+        if browser is not None:
+            self.track(browser_name, browser)
+        return browser
+
+    def is_tracked(self, browser):
+        return id(browser) in self._tracked
+
+    def checkout(self, browser_name):
+        """
+        Gets an idle browser of the given type, or None if there isn't one.
+        """
+        idle = self._idle.get(browser_name)
+        if not idle:
+            return self._join_launch(browser_name)
+        browser = idle.pop()
+        self._tracked[id(browser)][1] += 1
+        return browser
+
+    def checkin(self, browser):
+        """
+        Takes back a browser that's done with. It's reset and kept if there's room
+        and it hasn't been used too many times. Otherwise, it's quit.
+        :returns: bool, whether the browser was kept
+        """
+        browser_name, uses = self._tracked[id(browser)]
+        keep = (self.get_idle_count() < self.size and
+                (self.max_uses is None or uses < self.max_uses))
+        if keep:
+            try:
+                self.reset(browser)
+            except WebDriverException:
+                keep = False
+        if keep:
+            self._idle.setdefault(browser_name, []).append(browser)
+        else:
+            self.discard(browser)
+        return keep
+
+    @staticmethod
+    def reset(browser):
+        """
+        Resets a browser's state so it's as good as new for the next page object.
+        Cookies and storage can only be cleared for the site the browser is on.
+        """
+        handles = browser.window_handles
+        for handle in handles[1:]:
+            browser.switch_to.window(handle)
+            browser.close()
+        browser.switch_to.window(handles[0])
+        browser.delete_all_cookies()
+        browser.execute_script(_RESET_STORAGE)
+        browser.get("about:blank")
+
+    def discard(self, browser):
+        """
+        Quits a browser and stops tracking it.
+        """
+        self._tracked.pop(id(browser), None)
+        try:
+            browser.quit()
+        except WebDriverException:
+            pass
+
+    def get_idle_count(self):
+        return sum(len(idle) for idle in self._idle.values())
+
+    def quit_all(self):
+        """
+        Quits all idle browsers, including any launched in the background and never used.
+        """
+        for browser_name in self._launching.keys():
+            browser = self._join_launch(browser_name)
+            if browser is not None:
+                self.discard(browser)
+        for idle in self._idle.values():
+            for browser in idle:
+                self.discard(browser)
+        self._idle = {}
@@ -1,5 +1,6 @@
 from .base import _BaseActions, _SelectorsManager, _ComponentsManager, not_keyword
 from Selenium2Library.locators.elementfinder import ElementFinder
+from selenium.common.exceptions import StaleElementReferenceException
 
 
 
@@ -9,29 +10,131 @@ class _ComponentElementFinder(ElementFinder):
     instead of the driver. This allows us to limit our DOM search
     in components to the "reference webelement" instead of searching
     globally on the driver instance.
+
+    If the reference webelement has gone stale (for example, after an AJAX
+    re-render) the component is asked to find it again, and the search is retried once.
     """
 
-    def __init__(self, webelement):
+    def __init__(self, component):
 
         super(_ComponentElementFinder, self).__init__()
-        self._reference_webelement = webelement
+        self._component = component
 
     def find(self, browser, locator, tag=None):
         prefix = self._parse_locator(locator)[0]
         if prefix == "dom":
             return super(_ComponentElementFinder, self).find(browser, locator, tag=tag)
         else:
-            return super(_ComponentElementFinder, self).find(self._reference_webelement, locator, tag=tag)
+            try:
+                return super(_ComponentElementFinder, self).find(self._component.reference_webelement, locator, tag=tag)
+            except StaleElementReferenceException:
+                if not self._component._refresh_reference_webelement():
+                    raise
+                return super(_ComponentElementFinder, self).find(self._component.reference_webelement, locator, tag=tag)
 
 
 class Component(_BaseActions, _SelectorsManager, _ComponentsManager):
     def __init__(self, reference_webelement, *args, **kwargs):
         for base in Component.__bases__:
             base.__init__(self, *args, **kwargs)
+        self._init_component(reference_webelement)
+
+    def _init_component(self, reference_webelement):
         self.reference_webelement = reference_webelement
 
+        # How the reference webelement was found, so we can find it again if it goes stale.
+        # Set by the page or component that created this component.
+        self._parent = None
+        self._locator = None
+        self._index = None
+        # The TrackedComponents and key this component is tracked by, if any.
+        self._tracker = None
+
         # Pass the root webelement to our overridden component finder class.
-        self._element_finder = _ComponentElementFinder(self.reference_webelement)
+        self._element_finder = _ComponentElementFinder(self)
         self.name = self.__class__.__name__
 
+    @classmethod
+    def _from_parent(cls, parent, reference_webelement):
+        """
+        Builds a component for a page object or component that found its reference webelement.
+
+        Instead of constructing a whole new Selenium2Library instance, with its own options and
+        timeouts, the component borrows the parent's, so building one is little more than binding
+        the reference webelement. Component classes that define their own constructor are
+        constructed normally.
+        """
+        if cls.__init__.im_func is not Component.__init__.im_func:
+            return cls(reference_webelement)
+        component = cls.__new__(cls)
+        component.__dict__.update(parent._get_shared_state())
+        component.selectors = component._get_class_selectors()
+        component._init_component(reference_webelement)
+        return component
+
+    def _bind_locator_chain(self, parent, locator, index):
+        """
+        Records the page or component that found this component's reference webelement,
+        the locator it used, and the index of the reference webelement in the elements
+        matched by that locator.
+        """
+        self._parent = parent
+        self._locator = locator
+        self._index = index
+
+    def _refresh_reference_webelement(self):
+        """
+        Finds the reference webelement again after it has gone stale.
+        :returns: bool, whether the reference webelement could be found again.
+        """
+        if self._tracker is not None:
+            tracker, key = self._tracker
+            element = tracker._find_element(key)
+            if element is None:
+                return False
+            self.reference_webelement = element
+            return True
+        if self._parent is None or self._index is None:
+            return False
+        elements = self._parent._get_fresh_reference_elements(self._locator, self.reference_webelement)
+        try:
+            self.reference_webelement = elements[self._index]
+        except IndexError:
+            return False
+        return True
+
+    def _execute_on_root(self, script, *args):
+        try:
+            return super(Component, self)._execute_on_root(script, *args)
+        except StaleElementReferenceException:
+            if not self._refresh_reference_webelement():
+                raise
+            return super(Component, self)._execute_on_root(script, *args)
+
+    def _get_js_root(self):
+        return self.reference_webelement
+
+    def snapshot(self, fields):
+        """
+        Reads text and attributes from this component in one call to the browser,
+        instead of a find and a fetch per value.
+
+        :param fields: Maps the names of the values wanted to a selector or locator whose first
+                       match's text is read, or to a (selector or locator, attribute name) tuple.
+                       Use None as the selector or locator to read from the reference element
+                       itself. A list of selector names is shorthand for reading each one's text.
+        :type fields: dict or list
+        :returns: dict
+
+        Usage::
+
+            class ResultComponent(Component):
+                selectors = {"price": "css=.price", "title": "css=a.title"}
+
+            result.snapshot({"price": "price", "url": ("title", "href"), "id": (None, "data-id")})
+            # {"price": u"$14.00", "url": u"/products/1", "id": u"1"}
 
+        Plural component properties have a `snapshot` method too, which does the same for
+        every component at once. See `robotpageobjects.componentcollection.ComponentCollection`.
+        """
+        return self._execute_on_root("return (%s)(root);" % self._compile_snapshot(fields))
@@ -0,0 +1,370 @@
+"""
+Lazy collections of page components.
+
+The plural component properties of page objects and components (e.g. `page.results`)
+return a :class:`ComponentCollection` instead of a list. Nothing is looked up when the
+property is accessed. `len()` counts the matching elements with one query, and components
+are only built for the items that are actually indexed, sliced or iterated over::
+
+    len(page.results)           # One count query, no components built
+    page.results[0]             # Finds the reference elements, builds one component
+    page.results[:3]            # Builds three components
+    for result in page.results:  # Builds components one at a time
+        ...
+
+Use `get_instances` if you need a plain list of every component, or `handles` for a
+list of compact :class:`ComponentHandle` objects.
+"""
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from .connectionpool import concurrent_connections
+
+
+class ComponentCollection(object):
+    """
+    A read-only sequence of the components of one class found by a page object
+    or component. It supports what read-only lists do (indexing, slicing, `in`, `index`,
+    `count`, `+` and comparing to lists), but it isn't a list: use `get_instances`, or
+    `list(collection)`, where a real list is needed.
+    """
+
+    def __init__(self, parent, component_class, locator):
+        """
+        :param parent: The page object or component the components belong to
+        :param component_class: The component class
+        :param locator: The locator of the components' reference elements
+        """
+        self.parent = parent
+        self.component_class = component_class
+        self.locator = locator
+        self._reference_elements = None
+        self._components = {}
+
+    def _get_reference_elements(self):
+        """
+        Finds the reference elements the first time they're needed. After that,
+        the collection keeps referring to the same elements.
+        """
+        if self._reference_elements is None:
+            self._reference_elements = self.parent._find_component_reference_elements(self.locator, required=False)
+        return self._reference_elements
+
+    def _get_component(self, index):
+        try:
+            return self._components[index]
+        except KeyError:
+            component = self.parent._make_component(self.component_class,
+                                                    self._get_reference_elements()[index], self.locator, index)
+            self._components[index] = component
+            return component
+
+    def snapshot(self, fields):
+        """
+        Reads text and attributes from every component in the collection in one call
+        to the browser, without building any components. See
+        `robotpageobjects.component.Component.snapshot` for the format of `fields`.
+
+        :returns: list of dicts, one per component
+        """
+        # Selectors in `fields` are the component's, so compile them with a component that
+        # isn't bound to a reference element.
+        extractor = self.component_class._from_parent(self.parent, None)._compile_snapshot(fields)
+        finder = None if self._reference_elements is not None else self.parent._get_js_finder(self.locator)
+        if finder is None:
+            elements = self._get_reference_elements()
+            return self.parent._execute_on_root("var extract = %s;\n"
+                                                "return arguments[1].map(function(el) { return extract(el); });"
+                                                % extractor, elements)
+        return self.parent._execute_on_root("var extract = %s;\n"
+                                            "return (%s)(root).map(function(el) { return extract(el); });"
+                                            % (extractor, finder))
+
+    def handles(self):
+        """
+        Gets a compact :class:`ComponentHandle` for each component, for holding on to
+        many components (for example to compare two large tables) without the memory cost
+        of full components. Each handle turns into a full component when it's used.
+
+        :returns: list of ComponentHandle
+        """
+        return [ComponentHandle(self.parent, self.component_class, reference_webelement, index)
+                for index, reference_webelement in enumerate(self._get_reference_elements())]
+
+    def map(self, name, *args, **kwargs):
+        """
+        Reads a property, or calls a method, on every component in the collection,
+        several components at a time. Each worker thread sends its commands to the
+        browser over its own connection to the same session, so with a remote browser
+        the network round-trips overlap instead of adding up.
+
+        :param name: The name of the property or method, or a callable taking a component
+        :type name: str or callable
+        :param workers: Keyword only. The number of threads, and so of connections to the
+                        browser. Defaults to 8.
+        :type workers: int
+        :param args: Arguments to pass if `name` is a method
+        :param kwargs: Keyword arguments, other than `workers`, to pass if `name` is a method
+        :returns: list of results, in the order of the components
+
+        Usage::
+
+            prices = page.results.map("price", workers=8)
+            links = page.results.map("get_attribute", "href")
+        """
+        workers = kwargs.pop("workers", 8)
+
+        def evaluate(index):
+            component = self._get_component(index)
+            if callable(name):
+                return name(component)
+            value = getattr(component, name)
+            return value(*args, **kwargs) if callable(value) else value
+
+        indexes = range(len(self._get_reference_elements()))
+        if workers <= 1 or len(indexes) <= 1:
+            return [evaluate(index) for index in indexes]
+
+        # Build the components up front, so the threads only talk to the browser.
+        for index in indexes:
+            self._get_component(index)
+        pool = ThreadPool(min(workers, len(indexes)))
+        driver = self.parent.driver
+        try:
+            with concurrent_connections(driver):
+                # The threads poll for elements instead. See _element_find.
+                driver.implicitly_wait(0)
+                try:
+                    return pool.map(evaluate, indexes)
+                finally:
+                    driver.implicitly_wait(self.parent.selenium_implicit_wait)
+        finally:
+            pool.close()
+            pool.join()
+
+    def track(self, key):
+        """
+        Gets a :class:`TrackedComponents` that follows changes to this collection,
+        for lists that update in place, like infinite scroll or live feeds.
+
+        :param key: What identifies each component: "@" followed by an attribute name
+                    of the reference element, like "@data-id", or the component's selector or
+                    locator whose text is the key, or a (selector or locator, attribute name) tuple.
+        :returns: TrackedComponents
+        """
+        return TrackedComponents(self.parent, self.component_class, self.locator, key)
+
+    def __len__(self):
+        if self._reference_elements is None:
+            # Doesn't wait for elements to appear when the locator can be evaluated in the browser.
+            return self.parent._count_elements(self.locator)
+        return len(self._reference_elements)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get_component(i) for i in xrange(*index.indices(len(self._get_reference_elements())))]
+        length = len(self._get_reference_elements())
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("component index out of range")
+        return self._get_component(index)
+
+    def __iter__(self):
+        # Counting first keeps an empty collection from waiting for elements.
+        if self._reference_elements is None and not len(self):
+            return
+        for index in xrange(len(self._get_reference_elements())):
+            yield self._get_component(index)
+
+    def __contains__(self, component):
+        return any(component == other for other in self)
+
+    def __eq__(self, other):
+        if isinstance(other, ComponentCollection):
+            other = list(other)
+        return isinstance(other, list) and list(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    # Unhashable, like lists.
+    __hash__ = None
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def index(self, component):
+        return list(self).index(component)
+
+    def count(self, component):
+        return list(self).count(component)
+
+    def __nonzero__(self):
+        return len(self) > 0
+
+    def __repr__(self):
+        return "<%s of %s at \"%s\">" % (self.__class__.__name__, self.component_class.__name__, self.locator)
+
+
+class ComponentHandle(object):
+    """
+    Stands in for a component, holding only what's needed to build it: the reference
+    element, the component class and the page object or component that found it. The
+    component is built the first time any of its attributes or methods are used, and the
+    handle delegates to it from then on.
+
+    Handles compare equal when they refer to the same element with the same component class.
+    """
+
+    __slots__ = ("reference_webelement", "component_class", "parent", "index", "_component")
+
+    def __init__(self, parent, component_class, reference_webelement, index):
+        self.parent = parent
+        self.component_class = component_class
+        self.reference_webelement = reference_webelement
+        self.index = index
+        self._component = None
+
+    def materialize(self):
+        """
+        Gets the full component, building it if necessary.
+        :returns: Component
+        """
+        if self._component is None:
+            locator = self.parent._get_component_locator(self.component_class)
+            self._component = self.parent._make_component(self.component_class, self.reference_webelement,
+                                                          locator, self.index)
+        return self._component
+
+    def __getattr__(self, name):
+        # Don't build the component when something like copy or hasattr probes for special attributes.
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+    def __eq__(self, other):
+        return (isinstance(other, ComponentHandle) and self.component_class is other.component_class and
+                self.reference_webelement == other.reference_webelement)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.component_class, self.reference_webelement))
+
+    def __repr__(self):
+        return "<%s of %s #%s>" % (self.__class__.__name__, self.component_class.__name__, self.index)
+
+
+class TrackedComponents(object):
+    """
+    Keeps components keyed by a stable value, such as a data attribute, and finds out what
+    changed with one call to the browser per `refresh`. Only new components are built, so the
+    cost of a refresh depends on the size of the change rather than the size of the list::
+
+        feed = page.items.track("@data-id")
+        feed.refresh()              # Everything is new the first time
+        ...
+        added, removed = feed.refresh()
+
+    Elements without a key are ignored.
+    """
+
+    def __init__(self, parent, component_class, locator, key):
+        self.parent = parent
+        self.component_class = component_class
+        self.locator = locator
+        if isinstance(key, basestring) and key.startswith("@"):
+            key = (None, key[1:])
+        self.key = key
+        # key -> component, in the order the components were found.
+        self._components = OrderedDict()
+
+    def _get_script(self):
+        finder = self.parent._get_js_finder(self.locator)
+        if finder is None:
+            raise ValueError("Locator \"%s\" can't be evaluated in the browser, so its components can't be tracked."
+                             % self.locator)
+        extractor = self.component_class._from_parent(self.parent, None)._compile_snapshot({"key": self.key})
+        return _TRACK % (extractor, finder)
+
+    def refresh(self):
+        """
+        Finds the components added and removed since the last refresh.
+        :returns: tuple of (list of added components, list of removed components)
+        """
+        added_elements, removed_keys, rerendered = self.parent._execute_on_root(self._get_script(),
+                                                                                self._components.keys())
+        added = []
+        for key, reference_webelement in added_elements:
+            # Tracked components aren't refreshed by index when they go stale, since the
+            # list moves around. They're found again by key instead.
+            component = self.parent._make_component(self.component_class, reference_webelement, self.locator, None)
+            component._tracker = (self, key)
+            self._components[key] = component
+            added.append(component)
+        # Items that were rendered again keep their components, bound to the new elements.
+        for key, reference_webelement in rerendered:
+            self._components[key].reference_webelement = reference_webelement
+        removed = [self._components.pop(key) for key in removed_keys]
+        return added, removed
+
+    def _find_element(self, key):
+        """
+        Finds the current reference element of the item with a given key, for a
+        tracked component whose reference element has gone stale.
+        :returns: WebElement, or None if there's no such item anymore
+        """
+        extractor = self.component_class._from_parent(self.parent, None)._compile_snapshot({"key": self.key})
+        return self.parent._execute_on_root(_FIND_BY_KEY % (extractor, self.parent._get_js_finder(self.locator)),
+                                            key)
+
+    def keys(self):
+        return self._components.keys()
+
+    def __getitem__(self, key):
+        return self._components[key]
+
+    def __contains__(self, key):
+        return key in self._components
+
+    def __len__(self):
+        return len(self._components)
+
+    def __iter__(self):
+        return iter(self._components.values())
+
+
+_TRACK = """var extract = %s;
+var known = {};
+for (var i = 0; i < arguments[1].length; i++) { known[arguments[1][i]] = true; }
+var seen = {}, added = [], removed = [], rerendered = [];
+var els = (%s)(root);
+for (var i = 0; i < els.length; i++) {
+    var key = extract(els[i]).key;
+    if (key === null || seen.hasOwnProperty(key)) { continue; }
+    seen[key] = true;
+    if (!known.hasOwnProperty(key)) {
+        added.push([key, els[i]]);
+    } else if (els[i].__rpoTrackedKey !== key) {
+        // A known item whose element has been replaced since the last refresh.
+        rerendered.push([key, els[i]]);
+    }
+    els[i].__rpoTrackedKey = key;
+}
+for (var key in known) {
+    if (known.hasOwnProperty(key) && !seen.hasOwnProperty(key)) { removed.push(key); }
+}
+return [added, removed, rerendered];"""
+
+
+_FIND_BY_KEY = """var extract = %s;
+var els = (%s)(root);
+for (var i = 0; i < els.length; i++) {
+    if (extract(els[i]).key === arguments[1]) { return els[i]; }
+}
+return null;"""
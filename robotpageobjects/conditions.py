@@ -0,0 +1,287 @@
+"""
+Composable conditions for :meth:`robotpageobjects.page.Page.wait_for`.
+
+Instead of waiting for several things one after the other, each with its own
+polling loop, combine them and wait once::
+
+    from robotpageobjects.conditions import all_of, not_, element_visible, url_contains
+
+    class MyPage(Page):
+        ...
+        def search(self, term):
+            ...
+            self.wait_for(all_of(element_visible("results"),
+                                 not_(element_visible("spinner")),
+                                 url_contains("/results")))
+            return ResultsPage()
+
+Conditions over locators and the URL are compiled into a single JavaScript
+predicate, so each poll costs one round-trip to the browser regardless of how
+many conditions are combined. Conditions that can't be evaluated in the browser
+(for example, locators using a custom strategy, or plain Python callables passed to
+:class:`predicate`) are evaluated in Python on each poll instead.
+
+If the wait times out, the error message lists the sub-conditions that weren't met.
+"""
+import json
+
+from . import jslocators
+
+
+class Condition(object):
+    """
+    Base class for all conditions. Conditions can be combined with
+    `&`, `|` and `~` as shorthand for :class:`all_of`, :class:`any_of`
+    and :class:`not_`.
+    """
+
+    def __and__(self, other):
+        return all_of(self, other)
+
+    def __or__(self, other):
+        return any_of(self, other)
+
+    def __invert__(self):
+        return not_(self)
+
+    def leaves(self):
+        """
+        Gets the leaf conditions, in evaluation order.
+        :returns: list
+        """
+        raise NotImplementedError
+
+    def is_met(self, results):
+        """
+        Given the results of evaluating the leaves, keyed by leaf id,
+        determines whether this condition is met.
+        :param results: Leaf results
+        :type results: dict
+        :returns: bool
+        """
+        raise NotImplementedError
+
+    def unmet(self, results):
+        """
+        Gets descriptions of the sub-conditions responsible for this condition not being met.
+        :param results: Leaf results
+        :type results: dict
+        :returns: list of str
+        """
+        return [] if self.is_met(results) else [self.describe()]
+
+    def describe(self):
+        raise NotImplementedError
+
+    def __str__(self):
+        return self.describe()
+
+
+class _Leaf(Condition):
+    """
+    A condition that is evaluated directly, either in the browser
+    or in Python.
+    """
+
+    def leaves(self):
+        return [self]
+
+    def is_met(self, results):
+        return results[id(self)]
+
+    def to_script(self, page):
+        """
+        Gets a JavaScript expression evaluating to a boolean, or None if
+        the condition has to be evaluated in Python. The expression may use
+        `root`, which is the document or a component's reference element.
+        :param page: The page object or component waiting for the condition
+        :returns: str or None
+        """
+        return None
+
+    def evaluate(self, page):
+        """
+        Evaluates the condition in Python.
+        :param page: The page object or component waiting for the condition
+        :returns: bool
+        """
+        raise NotImplementedError
+
+
+class _LocatorLeaf(_Leaf):
+
+    def __init__(self, locator):
+        self.locator = locator
+
+    def _find_script(self, page):
+        finder = page._get_js_finder(self.locator)
+        if finder is None:
+            return None
+        return "(%s)(root)" % finder
+
+    def _find(self, page):
+        return page._element_find(self.locator, True, False, wait=0)
+
+
+class element_present(_LocatorLeaf):
+    """
+    Met when the selector or locator matches at least one element.
+    """
+
+    def to_script(self, page):
+        found = self._find_script(page)
+        return None if found is None else "%s.length > 0" % found
+
+    def evaluate(self, page):
+        return self._find(page) is not None
+
+    def describe(self):
+        return "element \"%s\" is present" % self.locator
+
+
+class element_visible(_LocatorLeaf):
+    """
+    Met when the first element matched by the selector or locator is visible.
+    """
+
+    def to_script(self, page):
+        found = self._find_script(page)
+        return None if found is None else "(%s)(%s[0])" % (jslocators.IS_VISIBLE, found)
+
+    def evaluate(self, page):
+        el = self._find(page)
+        return el is not None and el.is_displayed()
+
+    def describe(self):
+        return "element \"%s\" is visible" % self.locator
+
+
+class url_contains(_Leaf):
+    """
+    Met when the current URL contains the given text.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    def to_script(self, page):
+        return "window.location.href.indexOf(%s) !== -1" % json.dumps(self.text)
+
+    def describe(self):
+        return "URL contains \"%s\"" % self.text
+
+
+class predicate(_Leaf):
+    """
+    Wraps a Python callable taking no arguments. Met when the callable
+    returns a truthy value. An AssertionError raised by the callable
+    counts as not met, as with plain :meth:`wait_for` callbacks.
+    """
+
+    def __init__(self, fn, description=None):
+        self.fn = fn
+        self.description = description or getattr(fn, "__name__", repr(fn))
+
+    def evaluate(self, page):
+        try:
+            return bool(self.fn())
+        except AssertionError:
+            return False
+
+    def describe(self):
+        return self.description
+
+
+class _Composite(Condition):
+
+    joiner = None
+
+    def __init__(self, *conditions):
+        self.conditions = [c if isinstance(c, Condition) else predicate(c) for c in conditions]
+
+    def leaves(self):
+        ret = []
+        for condition in self.conditions:
+            ret.extend(condition.leaves())
+        return ret
+
+    def describe(self):
+        return "(%s)" % (" %s " % self.joiner).join(c.describe() for c in self.conditions)
+
+
+class all_of(_Composite):
+    """
+    Met when all of the given conditions are met.
+    """
+    joiner = "and"
+
+    def is_met(self, results):
+        return all(c.is_met(results) for c in self.conditions)
+
+    def unmet(self, results):
+        ret = []
+        for condition in self.conditions:
+            ret.extend(condition.unmet(results))
+        return ret
+
+
+class any_of(_Composite):
+    """
+    Met when at least one of the given conditions is met.
+    """
+    joiner = "or"
+
+    def is_met(self, results):
+        return any(c.is_met(results) for c in self.conditions)
+
+
+class not_(Condition):
+    """
+    Met when the given condition is not met.
+    """
+
+    def __init__(self, condition):
+        self.condition = condition if isinstance(condition, Condition) else predicate(condition)
+
+    def leaves(self):
+        return self.condition.leaves()
+
+    def is_met(self, results):
+        return not self.condition.is_met(results)
+
+    def describe(self):
+        return "not %s" % self.condition.describe()
+
+
+def evaluate(condition, page):
+    """
+    Evaluates a condition on behalf of a page object or component. All leaves that
+    can be evaluated in the browser are evaluated with one `execute_script` call.
+
+    :param condition: The condition to evaluate
+    :type condition: Condition
+    :param page: The page object or component
+    :returns: tuple of (bool, list of unmet sub-condition descriptions)
+    """
+    results = {}
+    scripted = []
+    for leaf in condition.leaves():
+        if id(leaf) in results:
+            continue
+        script = leaf.to_script(page)
+        if script is None:
+            results[id(leaf)] = leaf.evaluate(page)
+        else:
+            scripted.append((leaf, script))
+            # Placeholder so a leaf used twice is only evaluated once.
+            results[id(leaf)] = False
+
+    if scripted:
+        checks = ",\n".join("(function() { try { return !!(%s); } catch (e) { return false; } })()" % script
+                            for leaf, script in scripted)
+        values = page._execute_poll("return [%s];" % checks)
+        for (leaf, script), value in zip(scripted, values):
+            results[id(leaf)] = bool(value)
+
+    met = condition.is_met(results)
+    return met, [] if met else condition.unmet(results)
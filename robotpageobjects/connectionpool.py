@@ -0,0 +1,206 @@
+"""
+Connections to WebDriver servers.
+
+:class:`PooledRemoteConnection` is the command executor of the remote sessions page objects
+start. It keeps connections to the server alive between commands, counts how often they're
+reused, and can pipeline commands whose results nobody looks at.
+
+:func:`concurrent_connections` lets several threads drive one WebDriver session at the same time.
+
+A WebDriver instance sends every command over its command executor, one request at a time.
+While :func:`concurrent_connections` is in effect, the driver's command executor is swapped
+for one that gives each thread its own keep-alive connection to the same server and session,
+so commands from different threads, including commands sent through WebElements the driver
+already found, go out in parallel. This is meant for reading from the page, which WebDriver
+servers handle concurrently. Use it for anything else at your own risk.
+"""
+from contextlib import contextmanager
+import os
+import Queue
+import socket
+import threading
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+import urllib3
+
+
+# Identifies the test process to the server, so a `robotpageobjects.hub.LocalHub` can share sessions fairly.
+CLIENT_HEADER = "X-Robotpageobjects-Client"
+
+# Commands that return nothing of interest, so they can be sent without waiting for the response.
+_FIRE_AND_FORGET = frozenset([Command.IMPLICIT_WAIT, Command.SET_SCRIPT_TIMEOUT, Command.SET_TIMEOUTS,
+                              Command.DELETE_ALL_COOKIES, Command.DELETE_COOKIE, Command.ADD_COOKIE])
+
+
+class PooledRemoteConnection(RemoteConnection):
+    """
+    A command executor that sends commands over a pool of keep-alive connections.
+
+    With pipelining on, commands in `_FIRE_AND_FORGET` are queued and sent in order by a
+    background thread, and `execute` returns a successful response right away. Any other
+    command first waits for the queued ones to be sent. If a queued command failed, the next
+    command raises a WebDriverException saying so instead of being sent.
+    """
+
+    def __init__(self, remote_server_addr, pipelining=False, maxsize=4):
+        """
+        :param remote_server_addr: The server's URL
+        :param pipelining: Whether to pipeline fire-and-forget commands
+        :type pipelining: bool
+        :param maxsize: The maximum number of idle connections to keep per server
+        :type maxsize: int
+        """
+        RemoteConnection.__init__(self, remote_server_addr, keep_alive=True)
+        self._conn = urllib3.PoolManager(timeout=self._timeout, maxsize=maxsize)
+        self.pipelining = pipelining
+        self._requests = 0
+        self._pipelined = 0
+        self._queue = None
+        self._pipeline_error = None
+
+    @classmethod
+    def get_remote_connection_headers(cls, parsed_url, keep_alive=False):
+        headers = super(PooledRemoteConnection, cls).get_remote_connection_headers(parsed_url, keep_alive)
+        headers[CLIENT_HEADER] = "%s-%s" % (socket.gethostname(), os.getpid())
+        return headers
+
+    def get_stats(self):
+        """
+        Gets how many requests were sent, how many connections were opened for them (so the
+        rest reused a connection), and how many commands were pipelined.
+        :returns: dict
+        """
+        pools = self._conn.pools
+        connections = sum(pools[key].num_connections for key in pools.keys())
+        return {"requests": self._requests, "connections": connections,
+                "reused": self._requests - connections, "pipelined": self._pipelined}
+
+    def _request(self, method, url, body=None):
+        self._requests += 1
+        return RemoteConnection._request(self, method, url, body)
+
+    def execute(self, command, params):
+        if self.pipelining and command in _FIRE_AND_FORGET:
+            self._get_queue().put((command, params))
+            self._pipelined += 1
+            return {"status": 0, "value": None}
+        self.flush()
+        return RemoteConnection.execute(self, command, params)
+
+    def _get_queue(self):
+        if self._queue is None:
+            self._queue = Queue.Queue()
+            thread = threading.Thread(target=self._send_queued, name="robotpageobjects-pipeline")
+            thread.daemon = True
+            thread.start()
+        return self._queue
+
+    def _send_queued(self):
+        while True:
+            command, params = self._queue.get()
+            try:
+                if self._pipeline_error is None:
+                    response = RemoteConnection.execute(self, command, params)
+                    status = response.get("status") if response else None
+                    if status not in (None, 0) or (status is None and isinstance(response.get("value"), dict)
+                                                   and "error" in response["value"]):
+                        self._pipeline_error = "%s: %s" % (command, response.get("value"))
+            except Exception as e:
+                self._pipeline_error = "%s: %s" % (command, e)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """
+        Waits for pipelined commands to be sent.
+        """
+        if self._queue is not None:
+            self._queue.join()
+        if self._pipeline_error is not None:
+            error, self._pipeline_error = self._pipeline_error, None
+            raise WebDriverException("A pipelined command failed. %s" % error)
+
+
+class ThreadLocalConnections(object):
+    """
+    Stands in for a driver's command executor, sending each thread's commands
+    over a command executor of that thread's own, to the same server.
+    """
+
+    def __init__(self, connection):
+        """
+        :param connection: The driver's command executor
+        :type connection: selenium.webdriver.remote.remote_connection.RemoteConnection
+        """
+        self.connection = connection
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._clones = []
+
+    def _get_connection(self):
+        clone = getattr(self._local, "connection", None)
+        if clone is None:
+            # A new executor rather than a copy, so threads share no state, like a pipeline
+            # queue, with the driver's. Pipelining is off for threads' commands.
+            if isinstance(self.connection, PooledRemoteConnection):
+                clone = PooledRemoteConnection(self.connection._url)
+            else:
+                clone = RemoteConnection(self.connection._url, keep_alive=True, resolve_ip=False)
+            if hasattr(self.connection, "w3c"):
+                clone.w3c = self.connection.w3c
+            # Browser-specific executors add commands of their own.
+            clone._commands = self.connection._commands
+            with self._lock:
+                self._clones.append(clone)
+            self._local.connection = clone
+        return clone
+
+    def execute(self, command, params):
+        return self._get_connection().execute(command, params)
+
+    def close(self):
+        """
+        Closes the connections opened by threads.
+        """
+        with self._lock:
+            for clone in self._clones:
+                clone._conn.clear()
+            self._clones = []
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+@contextmanager
+def concurrent_connections(driver):
+    """
+    Context manager within which each thread sends `driver`'s commands over its own
+    connection. The number of connections is bounded by the number of threads that use
+    the driver, so use a bounded pool of threads.
+
+    :param driver: The WebDriver instance
+    """
+    original = driver.command_executor
+    if isinstance(original, ThreadLocalConnections):
+        # Already in effect further up the stack.
+        yield driver
+        return
+    if isinstance(original, PooledRemoteConnection):
+        original.flush()
+    connections = ThreadLocalConnections(original)
+    driver.command_executor = connections
+    try:
+        yield driver
+    finally:
+        driver.command_executor = original
+        connections.close()
+
+
+def is_concurrent(driver):
+    """
+    Tells whether `driver` is being used by several threads through :func:`concurrent_connections`.
+    Settings that apply to the whole session, like the implicit wait, mustn't be changed then.
+    """
+    return isinstance(driver.command_executor, ThreadLocalConnections)
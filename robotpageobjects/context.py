@@ -1,4 +1,6 @@
-from robot.libraries.BuiltIn import BuiltIn
+import os
+
+from robot.libraries.BuiltIn import BuiltIn, RobotNotRunningError
 from robot.running.context import EXECUTION_CONTEXTS
 from monkeypatches import do_monkeypatches
 
@@ -15,6 +17,10 @@ class Context(object):
     _keywords_exposed = False
     _cache = None
     _current_page = None
+    _deadline = None
+    _deadline_test = None
+    _browser_pool = None
+    _proxy = None
     def __new__(cls, *args, **kwargs):
         """
         Make this object a singleton. We're using this in optionhandler as well,
@@ -55,3 +61,60 @@ class Context(object):
     @classmethod
     def get_libraries(cls):
         return [lib.name for lib in EXECUTION_CONTEXTS.current.namespace.libraries]
+
+    @staticmethod
+    def get_output_dir():
+        """
+        Gets Robot's output directory, or the current directory outside Robot.
+        """
+        try:
+            return BuiltIn().get_variable_value("${OUTPUT DIR}") or os.getcwd()
+        except RobotNotRunningError:
+            return os.getcwd()
+
+    @staticmethod
+    def get_current_test():
+        """
+        Identifies the currently running Robot suite and test, or None outside Robot.
+        Read straight from Robot's execution context, since it's checked on every
+        element lookup while a test time budget is set.
+        """
+        context = EXECUTION_CONTEXTS.current
+        if context is None:
+            return None
+        return context.suite, getattr(context, "test", None)
+
+    @classmethod
+    def set_deadline(cls, deadline):
+        """
+        Sets the time (as returned by time.time()) by which the current test should finish.
+        Pass None to clear it.
+        """
+        cls._deadline = deadline
+        cls._deadline_test = cls.get_current_test()
+
+    @classmethod
+    def get_deadline(cls):
+        """
+        Gets the deadline for the current test. A deadline set during another
+        test doesn't apply.
+        """
+        if cls._deadline is not None and cls._deadline_test != cls.get_current_test():
+            cls._deadline = None
+        return cls._deadline
+
+    @classmethod
+    def set_browser_pool(cls, pool):
+        cls._browser_pool = pool
+
+    @classmethod
+    def get_browser_pool(cls):
+        return cls._browser_pool
+
+    @classmethod
+    def set_proxy(cls, proxy):
+        cls._proxy = proxy
+
+    @classmethod
+    def get_proxy(cls):
+        return cls._proxy
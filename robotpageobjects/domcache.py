@@ -0,0 +1,73 @@
+"""
+Caches the results of dom= locators.
+
+A dom= locator is a JavaScript expression, often a jQuery query, that Selenium2Library
+evaluates every time an element is looked up with it. When the `cache_dom_locators` option
+is set, page objects and their components keep the elements each expression returned, and
+only evaluate it again once the page has navigated or the DOM has changed.
+
+Checking whether a cached result is still good costs one small script, which evaluates
+the expression and returns the elements only if they might have changed. Changes are
+detected with a MutationObserver installed in the page. In browsers without one, the
+expression is evaluated on every lookup, as it would be without the cache.
+"""
+
+# Arguments are the token and DOM version the cached result was read at. The token
+# identifies the document, so it changes on navigation. Returns null if the cached result
+# is still good, or [token, version, result] otherwise.
+_LOOKUP = """var state = window.__rpoDomCache;
+if (!state) {
+    state = window.__rpoDomCache = {token: String(Math.random()), version: 0};
+    var Observer = window.MutationObserver || window.WebKitMutationObserver;
+    if (Observer) {
+        new Observer(function() { state.version++; }).observe(document, {
+            childList: true, subtree: true, attributes: true, characterData: true});
+    } else {
+        state.version = -1;
+    }
+}
+if (state.version >= 0 && arguments[0] === state.token && arguments[1] === state.version) {
+    return null;
+}
+return [state.token, state.version, (%s)];"""
+
+
+class DomLocatorCache(object):
+    """
+    The dom= locator results for one page object and its components, and
+    how many times each expression was evaluated.
+    """
+
+    def __init__(self):
+        # expression -> (token, version, elements)
+        self._entries = {}
+        # expression -> number of evaluations
+        self.evaluations = {}
+
+    def find(self, driver, expression):
+        """
+        Gets the elements returned by a dom= expression, evaluating it only if
+        the cached result might be out of date.
+        :param driver: The WebDriver instance
+        :param expression: The JavaScript expression, without the "dom=" prefix
+        :returns: list
+        """
+        entry = self._entries.get(expression)
+        token, version = entry[:2] if entry is not None else (None, None)
+        ret = driver.execute_script(_LOOKUP % expression, token, version)
+        if ret is None:
+            return list(entry[2])
+
+        token, version, result = ret
+        self.evaluations[expression] = self.evaluations.get(expression, 0) + 1
+        if result is None:
+            elements = []
+        elif isinstance(result, list):
+            elements = result
+        else:
+            elements = [result]
+        self._entries[expression] = (token, version, elements)
+        return list(elements)
+
+    def clear(self):
+        self._entries = {}
@@ -1,3 +1,6 @@
+from selenium.common.exceptions import WebDriverException
+
+
 class DuplicateKeyError(ValueError):
     """
     Raised when two selector dictionaries are merged and have a
@@ -62,4 +65,20 @@ class ComponentError(KeyError):
 class PageSelectionError(Exception):
     """Raised when a page object cannot be automatically selected
     as the return value of a method"""
-    pass
\ No newline at end of file
+    pass
+
+
+class BrowserSideError(Exception):
+    """
+    Raised when waiting or finding elements with the fail_on_browser_errors
+    option set, and the page under test has thrown a JavaScript error or
+    received a server error response to an XHR or fetch request.
+    """
+    pass
+
+
+class SessionHealthCheckError(WebDriverException):
+    """
+    Raised when a newly launched browser session doesn't run commands.
+    """
+    pass
@@ -0,0 +1,366 @@
+"""
+A stand-in for a Selenium grid hub, for running parallel jobs against local browsers.
+
+:class:`LocalHub` is an HTTP server speaking enough of the WebDriver protocol to be the
+`remote_url` of page objects. Each new session request waits in a queue until fewer than
+`max_sessions` sessions are open, then gets a browser started on this machine, through
+:class:`robotpageobjects.launcher.DriverLauncher`. Commands for the session are forwarded to
+that browser's driver, and deleting the session quits the browser and lets the next queued
+request through. A session that gets no commands for `idle_timeout` seconds, like one whose
+test process died without quitting its browser, is quit too.
+
+When several clients (test processes) are waiting, the next session goes to the client with
+the fewest open sessions, so one job can't starve the others. Page objects identify their
+process to the hub with a header. Other clients are told apart by address.
+
+Run it with::
+
+    python -m robotpageobjects.hub --port 4444 --max-sessions 4
+
+and point page objects at it with the `remote_url` option, e.g. PO_REMOTE_URL=http://localhost:4444/wd/hub.
+"""
+import BaseHTTPServer
+import SocketServer
+import argparse
+import httplib
+import itertools
+import json
+import threading
+import time
+import urlparse
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from .connectionpool import CLIENT_HEADER
+from .launcher import DriverLauncher, _TRANSIENT_ERRORS
+
+
+_WEBDRIVER_TYPES = {
+    "chrome": webdriver.Chrome,
+    "firefox": webdriver.Firefox,
+    "internet explorer": webdriver.Ie,
+    "opera": webdriver.Opera,
+    "phantomjs": webdriver.PhantomJS,
+    "safari": webdriver.Safari,
+}
+
+# JSON wire protocol status for a session that couldn't be created.
+_SESSION_NOT_CREATED = 33
+
+
+class SessionScheduler(object):
+    """
+    Limits the number of open sessions, handing out free slots fairly between clients.
+    """
+
+    def __init__(self, max_sessions):
+        """
+        :param max_sessions: The maximum number of open sessions
+        :type max_sessions: int
+        """
+        self.max_sessions = max_sessions
+        self._condition = threading.Condition()
+        # client -> number of open sessions
+        self._active = {}
+        # (client, sequence number) of waiting requests
+        self._waiting = []
+        self._sequence = itertools.count()
+
+    def _get_next(self):
+        # The client with the fewest open sessions goes first, then the request that waited longest.
+        return min(self._waiting, key=lambda ticket: (self._active.get(ticket[0], 0), ticket[1]))
+
+    def acquire(self, client, timeout=None):
+        """
+        Waits for a free slot for `client`.
+        :param timeout: How long to wait, in seconds, or None to wait as long as it takes
+        :returns: bool, whether a slot was acquired
+        """
+        with self._condition:
+            ticket = (client, next(self._sequence))
+            self._waiting.append(ticket)
+            deadline = time.time() + timeout if timeout is not None else None
+            while self.get_active_count() >= self.max_sessions or self._get_next() is not ticket:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(ticket)
+                    self._condition.notify_all()
+                    return False
+                self._condition.wait(remaining)
+            self._waiting.remove(ticket)
+            self._active[client] = self._active.get(client, 0) + 1
+            self._condition.notify_all()
+            return True
+
+    def release(self, client):
+        """
+        Frees a slot `client` acquired.
+        """
+        with self._condition:
+            self._active[client] -= 1
+            if not self._active[client]:
+                del self._active[client]
+            self._condition.notify_all()
+
+    def get_active_count(self):
+        return sum(self._active.values())
+
+    def get_queued_count(self):
+        return len(self._waiting)
+
+
+class LocalHub(object):
+    """
+    Queues new session requests, starts local browsers for them and forwards their commands.
+    """
+
+    def __init__(self, max_sessions=1, queue_timeout=600, launch=None, idle_timeout=300):
+        """
+        :param max_sessions: The maximum number of browsers open at once
+        :type max_sessions: int
+        :param queue_timeout: How long a new session request may wait for a free slot, in seconds
+        :param idle_timeout: How long a session may go without commands before it's quit, in seconds,
+                             or None to keep sessions until they're deleted
+        :param launch: A callable taking a WebDriver class and desired capabilities that starts a
+                       browser. Defaults to launching with a `DriverLauncher`.
+        """
+        self.scheduler = SessionScheduler(max_sessions)
+        self.queue_timeout = queue_timeout
+        self.idle_timeout = idle_timeout
+        self._launch = launch or (lambda webdriver_type, capabilities:
+                                  DriverLauncher().launch(webdriver_type, desired_capabilities=capabilities))
+        self._lock = threading.Lock()
+        # session ID -> (client, driver)
+        self._sessions = {}
+        # session ID -> time of the session's last command
+        self._last_used = {}
+        self._server = None
+        self._stopped = threading.Event()
+
+    def start(self, host="127.0.0.1", port=0):
+        """
+        Starts serving in a background thread.
+        :returns: The URL to use as the `remote_url` option
+        """
+        self._server = _ThreadingHTTPServer((host, port), _HubHandler)
+        self._server.hub = self
+        thread = threading.Thread(target=self._server.serve_forever, name="robotpageobjects-hub")
+        thread.daemon = True
+        thread.start()
+        self._start_reaper()
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return "http://%s:%s/wd/hub" % (host, port)
+
+    def serve_forever(self, host="127.0.0.1", port=4444):
+        self._server = _ThreadingHTTPServer((host, port), _HubHandler)
+        self._server.hub = self
+        self._start_reaper()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+        Stops serving and quits all open browsers.
+        """
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for session_id in list(self._sessions):
+            self.delete_session(session_id)
+
+    def get_status(self):
+        return {"ready": self.scheduler.get_active_count() < self.scheduler.max_sessions,
+                "sessions": self.scheduler.get_active_count(), "queued": self.scheduler.get_queued_count(),
+                "max_sessions": self.scheduler.max_sessions}
+
+    def new_session(self, client, capabilities):
+        """
+        Waits for a free slot, then starts a browser.
+        :returns: The driver
+        """
+        browser_name = (capabilities.get("browserName") or "").lower()
+        webdriver_type = _WEBDRIVER_TYPES.get(browser_name)
+        if webdriver_type is None:
+            raise ValueError("The hub can't start a \"%s\" browser." % browser_name)
+        if not self.scheduler.acquire(client, self.queue_timeout):
+            raise ValueError("Timed out after %ss waiting for one of %s sessions to be free."
+                             % (self.queue_timeout, self.scheduler.max_sessions))
+        try:
+            driver = self._launch(webdriver_type, capabilities)
+        except:
+            self.scheduler.release(client)
+            raise
+        with self._lock:
+            self._sessions[driver.session_id] = (client, driver)
+            self._last_used[driver.session_id] = time.time()
+        return driver
+
+    def get_driver(self, session_id):
+        """
+        Gets a session's driver, to send it a command, noting that the session is in use.
+        :returns: The driver, or None if there's no such session
+        """
+        with self._lock:
+            if session_id in self._sessions:
+                self._last_used[session_id] = time.time()
+            return self._sessions.get(session_id, (None, None))[1]
+
+    def delete_session(self, session_id):
+        """
+        Quits a session's browser, freeing its slot.
+        :returns: bool, whether there was such a session
+        """
+        with self._lock:
+            client, driver = self._sessions.pop(session_id, (None, None))
+            self._last_used.pop(session_id, None)
+        if driver is None:
+            return False
+        try:
+            driver.quit()
+        except (WebDriverException,) + _TRANSIENT_ERRORS:
+            pass
+        finally:
+            self.scheduler.release(client)
+        return True
+
+    def reap_idle_sessions(self):
+        """
+        Quits the sessions that have gone without commands for longer than `idle_timeout`.
+        :returns: The IDs of the sessions quit
+        """
+        if self.idle_timeout is None:
+            return []
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            idle = [session_id for session_id, last_used in self._last_used.items() if last_used < cutoff]
+        return [session_id for session_id in idle if self.delete_session(session_id)]
+
+    def _start_reaper(self):
+        if self.idle_timeout is None:
+            return
+        self._stopped.clear()
+        interval = min(self.idle_timeout, 5)
+
+        def reap():
+            while not self._stopped.wait(interval):
+                self.reap_idle_sessions()
+
+        thread = threading.Thread(target=reap, name="robotpageobjects-hub-reaper")
+        thread.daemon = True
+        thread.start()
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class _HubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def _send_json(self, code, body):
+        body = json.dumps(body)
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(500, {"status": status, "value": {"message": message}})
+
+    def _handle(self):
+        hub = self.server.hub
+        path = self.path[len("/wd/hub"):] if self.path.startswith("/wd/hub") else self.path
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        parts = [part for part in path.split("?")[0].split("/") if part]
+
+        if parts == ["status"]:
+            self._send_json(200, {"status": 0, "value": hub.get_status()})
+        elif parts == ["session"] and self.command == "POST":
+            self._new_session(body)
+        elif len(parts) == 2 and parts[0] == "session" and self.command == "DELETE":
+            hub.delete_session(parts[1])
+            self._send_json(200, {"sessionId": parts[1], "status": 0, "value": None})
+        elif len(parts) > 1 and parts[0] == "session":
+            self._forward(hub.get_driver(parts[1]), path, body)
+        else:
+            self._send_json(404, {"status": 9, "value": {"message": "Unknown command: %s %s"
+                                                                  % (self.command, self.path)}})
+
+    do_GET = do_POST = do_DELETE = _handle
+
+    def _new_session(self, body):
+        try:
+            params = json.loads(body or "{}")
+        except ValueError:
+            params = {}
+        capabilities = params.get("desiredCapabilities")
+        if capabilities is None:
+            w3c = params.get("capabilities", {})
+            capabilities = dict(w3c.get("alwaysMatch", {}), **(w3c.get("firstMatch") or [{}])[0])
+        client = self.headers.get(CLIENT_HEADER) or self.client_address[0]
+        try:
+            driver = self.server.hub.new_session(client, capabilities)
+        except (ValueError, WebDriverException) + _TRANSIENT_ERRORS as e:
+            self._send_error(_SESSION_NOT_CREATED, str(e))
+            return
+        if driver.w3c:
+            self._send_json(200, {"value": {"sessionId": driver.session_id, "capabilities": driver.capabilities}})
+        else:
+            self._send_json(200, {"sessionId": driver.session_id, "status": 0, "value": driver.capabilities})
+
+    def _forward(self, driver, path, body):
+        if driver is None:
+            self._send_json(404, {"status": 6, "value": {"message": "No such session."}})
+            return
+        target = urlparse.urlsplit(driver.command_executor._url)
+        conn = httplib.HTTPConnection(target.hostname, target.port or 80)
+        try:
+            conn.request(self.command, target.path.rstrip("/") + path, body or None,
+                         {"Content-Type": "application/json;charset=UTF-8"})
+            resp = conn.getresponse()
+            data = resp.read()
+        except (IOError, httplib.HTTPException) as e:
+            self._send_error(13, "Couldn't reach the browser's driver: %s" % e)
+            return
+        finally:
+            conn.close()
+        self.send_response(resp.status, resp.reason)
+        self.send_header("Content-Type", resp.getheader("Content-Type", "application/json;charset=UTF-8"))
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs a local stand-in for a Selenium grid hub.")
+    parser.add_argument("--host", default="127.0.0.1", help="The address to listen on")
+    parser.add_argument("--port", type=int, default=4444, help="The port to listen on")
+    parser.add_argument("--max-sessions", type=int, default=1, help="The maximum number of browsers open at once")
+    parser.add_argument("--queue-timeout", type=float, default=600,
+                        help="How long a new session request may wait for a free slot, in seconds")
+    parser.add_argument("--idle-timeout", type=float, default=300,
+                        help="How long a session may go without commands before it's quit, in seconds, "
+                             "or 0 to keep sessions until they're deleted")
+    args = parser.parse_args(argv)
+    hub = LocalHub(args.max_sessions, args.queue_timeout, idle_timeout=args.idle_timeout or None)
+    print "Serving on http://%s:%s/wd/hub with at most %s sessions." % (args.host, args.port, args.max_sessions)
+    try:
+        hub.serve_forever(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
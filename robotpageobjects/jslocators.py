@@ -0,0 +1,129 @@
+"""
+Helpers for translating Selenium2Library-style locators into JavaScript.
+
+Some operations (composed waits, counting components, snapshots) are much cheaper
+when several element lookups are folded into one `execute_script` call instead of
+issuing a WebDriver command per lookup. The functions here build the JavaScript
+sources for those lookups. Only strategies that can be evaluated faithfully in the
+browser are supported; for anything else :func:`compile_locator` returns None and
+callers should fall back to Selenium2Library's element finder.
+"""
+import json
+
+
+# Evaluates an XPath expression relative to a root node and returns an array of nodes.
+_XPATH_FINDER = """function(root) {
+    var doc = root.ownerDocument || root;
+    var res = doc.evaluate(%s, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var out = [];
+    for (var i = 0; i < res.snapshotLength; i++) { out.push(res.snapshotItem(i)); }
+    return out;
+}"""
+
+_CSS_FINDER = """function(root) {
+    return Array.prototype.slice.call(root.querySelectorAll(%s));
+}"""
+
+_ATTR_FINDER = """function(root) {
+    var value = %s;
+    return Array.prototype.filter.call(root.querySelectorAll("*"), function(el) {
+        return el.getAttribute(%s) === value;
+    });
+}"""
+
+_TAG_FINDER = """function(root) {
+    return Array.prototype.slice.call(root.getElementsByTagName(%s));
+}"""
+
+_JQUERY_FINDER = """function(root) {
+    return window.jQuery(%s, root).get();
+}"""
+
+# dom= expressions are global by definition, so the root is ignored, just as
+# Selenium2Library ignores it.
+_DOM_FINDER = """function(root) {
+    var res = (%s);
+    if (res === null || res === undefined) { return []; }
+    if (res.nodeType === undefined && res.length !== undefined) { return Array.prototype.slice.call(res); }
+    return [res];
+}"""
+
+# Visibility check used in place of WebElement.is_displayed(). It's an
+# approximation of Selenium's atom, good enough for waiting purposes.
+IS_VISIBLE = """function(el) {
+    if (!el) { return false; }
+    var style = window.getComputedStyle(el);
+    if (style.visibility === "hidden" || style.display === "none") { return false; }
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+}"""
+
+
+def compile_locator(prefix, criteria):
+    """
+    Gets the source of a JavaScript function taking a root node (the document or
+    an element) and returning an array of the elements matching the locator.
+
+    :param prefix: The locator strategy, as parsed by Selenium2Library's ElementFinder
+    :type prefix: str or None
+    :param criteria: The locator criteria
+    :type criteria: str
+    :returns: str or None if the strategy can't be evaluated in the browser
+    """
+    literal = json.dumps(criteria)
+    if prefix is None:
+        if criteria.startswith("//"):
+            return _XPATH_FINDER % literal
+        return None
+
+    prefix = prefix.strip().lower()
+    if prefix == "xpath":
+        return _XPATH_FINDER % literal
+    elif prefix == "css":
+        return _CSS_FINDER % literal
+    elif prefix in ("id", "name"):
+        return _ATTR_FINDER % (literal, json.dumps(prefix))
+    elif prefix == "tag":
+        return _TAG_FINDER % literal
+    elif prefix in ("jquery", "sizzle"):
+        return _JQUERY_FINDER % literal
+    elif prefix == "dom":
+        return _DOM_FINDER % criteria
+    return None
+
+
+def compile_snapshot(fields):
+    """
+    Gets the source of a JavaScript function taking an element and returning an
+    object with a value for each field.
+
+    :param fields: A list of (name, finder, attribute) tuples. `finder` is the source of
+                   a function as returned by :func:`compile_locator`, whose first match
+                   the value is read from, or None to read it from the element itself.
+                   `attribute` is the name of the attribute to read, or None for the text.
+    :type fields: list
+    :returns: str
+    """
+    reads = []
+    for name, finder, attribute in fields:
+        target = "el" if finder is None else "(%s)(el)[0]" % finder
+        if attribute is None:
+            read = "readText(%s)" % target
+        else:
+            read = "readAttribute(%s, %s)" % (target, json.dumps(attribute))
+        reads.append("%s: %s" % (json.dumps(name), read))
+    return _SNAPSHOT % ",\n            ".join(reads)
+
+
+_SNAPSHOT = """function(el) {
+    function readText(node) {
+        if (!node) { return null; }
+        var text = node.innerText === undefined ? node.textContent : node.innerText;
+        return text.replace(/^\\s+|\\s+$/g, "");
+    }
+    function readAttribute(node, name) {
+        return node ? node.getAttribute(name) : null;
+    }
+    return {
+            %s
+    };
+}"""
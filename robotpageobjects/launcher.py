@@ -0,0 +1,185 @@
+"""
+Starts WebDriver sessions reliably.
+
+Starting a browser fails now and then for reasons that have nothing to do with the test:
+a port that's still in use, a driver process that's slow to come up, a remote server at
+capacity. :class:`DriverLauncher` retries failed launches with a jittered exponential backoff,
+gives each attempt of a local driver its own free port, stops driver processes left behind by
+failed attempts, and checks that a new session actually runs commands before handing it over.
+
+Every launch is recorded, with how long it took, how many attempts it needed and why attempts
+failed. See :meth:`DriverLauncher.get_history` and :meth:`DriverLauncher.format_summary`.
+"""
+import httplib
+import inspect
+import random
+import time
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.utils import free_port
+import urllib3
+
+from . import exceptions
+
+
+# Errors worth retrying a launch for: not reaching the driver or server (IOError covers
+# socket errors and refused connections), and new sessions failing their health check.
+# Anything else, like bad capabilities, a session the server won't create or failed
+# authentication, fails straight away.
+_TRANSIENT_ERRORS = (IOError, httplib.HTTPException, urllib3.exceptions.HTTPError,
+                     exceptions.SessionHealthCheckError)
+
+# Selenium reports a local driver's service failing to come up as a plain WebDriverException.
+_SERVICE_ERROR_MESSAGES = ("Can not connect to the Service", "unexpectedly exited")
+
+
+def _is_transient(error):
+    """
+    Tells whether a launch that failed with `error` is worth retrying.
+    """
+    if isinstance(error, _TRANSIENT_ERRORS):
+        return True
+    return isinstance(error, WebDriverException) and any(message in (error.msg or "")
+                                                         for message in _SERVICE_ERROR_MESSAGES)
+
+
+class DriverLauncher(object):
+    """
+    Launches WebDriver instances, local or remote, with retries.
+    """
+
+    # Launch records for the whole test run, oldest first.
+    _history = []
+
+    # The first retry waits about this many seconds...
+    backoff = 0.25
+    # ...each retry waits twice as long as the one before, up to this many seconds...
+    max_backoff = 4.0
+    # ...and waits are randomized by up to this fraction, so parallel runs don't retry in lockstep.
+    jitter = 0.5
+
+    def __init__(self, attempts=6, log=None, sleep=time.sleep):
+        """
+        :param attempts: The maximum number of attempts per launch
+        :type attempts: int
+        :param log: A callable taking a message and a log level, for reporting failed attempts
+        :param sleep: Used to wait between attempts
+        """
+        self.attempts = max(1, attempts)
+        self._log = log or (lambda msg, level: None)
+        self._sleep = sleep
+
+    @classmethod
+    def get_history(cls):
+        """
+        Gets a record of every launch: the browser type, whether it succeeded, the number of
+        attempts, the time taken in seconds and the errors of failed attempts.
+        :returns: list of dicts
+        """
+        return list(cls._history)
+
+    @classmethod
+    def reset_history(cls):
+        cls._history = []
+
+    @classmethod
+    def format_summary(cls):
+        """
+        Summarizes the launch history as text, for reporting.
+        """
+        if not cls._history:
+            return "No browsers launched."
+        launched = [r for r in cls._history if r["succeeded"]]
+        retried = [r for r in cls._history if r["attempts"] > 1]
+        lines = ["%s launches, %s failed, %s needed retries." % (len(cls._history),
+                                                                 len(cls._history) - len(launched), len(retried))]
+        if launched:
+            elapsed = sorted(r["elapsed"] for r in launched)
+            lines.append("Launch time: median %.2fs, max %.2fs." % (elapsed[len(elapsed) // 2], elapsed[-1]))
+        causes = {}
+        for record in cls._history:
+            for error in record["errors"]:
+                causes[error] = causes.get(error, 0) + 1
+        for cause, count in sorted(causes.items(), key=lambda item: -item[1]):
+            lines.append("%5d x %s" % (count, cause))
+        return "\n".join(lines)
+
+    def _get_backoff(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def launch(self, webdriver_type, **kwargs):
+        """
+        Launches a WebDriver instance, retrying transient failures.
+
+        :param webdriver_type: The WebDriver class, like webdriver.PhantomJS or webdriver.Remote
+        :param kwargs: Arguments for the WebDriver class's constructor. Arguments it doesn't
+                       take are dropped, so callers can pass e.g. service_args for any browser.
+        :returns: WebDriver
+        """
+        accepted = inspect.getargspec(webdriver_type.__init__).args
+        kwargs = dict((name, value) for name, value in kwargs.iteritems() if name in accepted)
+        record = {"browser": webdriver_type.__name__, "succeeded": False, "attempts": 0, "errors": []}
+        self._history.append(record)
+        start = time.time()
+        try:
+            for attempt in range(1, self.attempts + 1):
+                record["attempts"] = attempt
+                if "port" in accepted:
+                    kwargs["port"] = free_port()
+                try:
+                    driver = self._launch_once(webdriver_type, kwargs)
+                except (WebDriverException,) + _TRANSIENT_ERRORS as e:
+                    if not _is_transient(e):
+                        raise
+                    cause = "%s: %s" % (e.__class__.__name__, str(e).strip().split("\n")[0])
+                    record["errors"].append(cause)
+                    self._log("Attempt %s of %s to launch %s failed. %s"
+                              % (attempt, self.attempts, webdriver_type.__name__, cause), "INFO")
+                    if attempt < self.attempts:
+                        self._sleep(self._get_backoff(attempt))
+                else:
+                    record["succeeded"] = True
+                    return driver
+        finally:
+            record["elapsed"] = time.time() - start
+
+        raise WebDriverException("Couldn't launch %s after %s attempts. Errors were:\n%s"
+                                 % (webdriver_type.__name__, self.attempts, "\n".join(record["errors"])))
+
+    def _launch_once(self, webdriver_type, kwargs):
+        # Construct in two steps, so if the constructor fails after starting the
+        # driver's service process, we still have a reference to stop it with.
+        driver = webdriver_type.__new__(webdriver_type)
+        try:
+            webdriver_type.__init__(driver, **kwargs)
+        except:
+            self._reap(driver)
+            raise
+
+        try:
+            try:
+                healthy = driver.execute_script("return 1;") == 1
+            except WebDriverException as e:
+                raise exceptions.SessionHealthCheckError("New session failed its health check. %s" % e.msg)
+            if not healthy:
+                raise exceptions.SessionHealthCheckError("New session failed its health check.")
+        except:
+            try:
+                driver.quit()
+            except Exception:
+                self._reap(driver)
+            raise
+        return driver
+
+    @staticmethod
+    def _reap(driver):
+        """
+        Stops the service process a half-started local driver left behind, if any.
+        """
+        service = driver.__dict__.get("service")
+        if service is not None:
+            try:
+                service.stop()
+            except Exception:
+                pass
@@ -1,33 +1,12 @@
 import re
 import pdb
 import sys
-from Selenium2Library import Selenium2Library
 from Selenium2Library.locators.tableelementfinder import TableElementFinder
 from Selenium2Library.keywords._tableelement import _TableElementKeywords
-from selenium import webdriver
-from selenium.common.exceptions import WebDriverException
 
 def do_monkeypatches():
     """"""
 
-    def _make_phantomjs(self , remote , desired_capabilities , profile_dir):
-        browser = None
-        tries = 0
-        while not browser and tries < 6:
-            try:
-                browser = self._generic_make_browser(webdriver.PhantomJS,
-                        webdriver.DesiredCapabilities.PHANTOMJS, remote, desired_capabilities)
-            except WebDriverException, e:
-                print "Couldn't connect to webdriver. WebDriverException was: " + str(e)
-                browser = None
-                tries += 1
-        if browser:
-            return browser
-        else:
-            raise WebDriverException("Couldn't connect to webdriver after several attempts")
-
-    Selenium2Library._make_phantomjs = _make_phantomjs
-
     ### BEGIN QAR-48165 monkey patch
     ### This adds consistent support for negative indexes in Robot keywords. 
     
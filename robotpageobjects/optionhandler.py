@@ -108,3 +108,13 @@ class OptionHandler(object):
             pass
         return ret
 
+    def get_bool(self, name, default=False):
+        """
+        Gets an option value as a boolean. Options set from environment
+        variables or the command-line are strings, so "true", "yes", "on" and "1"
+        (in any case) are True, and any other string is False.
+        """
+        ret = self.get(name, default)
+        if isinstance(ret, basestring):
+            return ret.strip().lower() in ("true", "yes", "on", "1")
+        return bool(ret)
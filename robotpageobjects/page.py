@@ -20,18 +20,29 @@
 """
 from __future__ import print_function
 import inspect
+import os
 import re
 import urllib2
+import urlparse
 
 import decorator
+import robot.utils
 from Selenium2Library import Selenium2Library
+from Selenium2Library.keywords._browsermanagement import FIREFOX_PROFILE_DIR
 from selenium import webdriver
-from selenium.common.exceptions import WebDriverException
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+from selenium.webdriver.common.proxy import Proxy, ProxyType
 import uritemplate
 
 from .base import _ComponentsManagerMeta, not_keyword, robot_alias, _BaseActions, _Keywords, Override, _SelectorsManager, _ComponentsManager
 from . import exceptions
+from .browserpool import BrowserPool
+from .connectionpool import PooledRemoteConnection, ThreadLocalConnections
 from .context import Context
+from .launcher import DriverLauncher
+from .proxy import FilteringProxy
+from .replay import ReplayArchive
+from .session import SessionStore
 from .sig import get_method_sig
 
 
@@ -129,6 +140,17 @@ class Page(_BaseActions, _SelectorsManager, _ComponentsManager):
     __metaclass__ = _PageMeta
     ROBOT_LIBRARY_SCOPE = 'TEST SUITE'
 
+    # Resources the browser shouldn't load while this page object is open, as shell-style
+    # URL patterns and content types. Allowed URLs are loaded even if blocked otherwise.
+    # See `robotpageobjects.proxy.FilteringProxy`.
+    blocked_urls = ()
+    blocked_content_types = ()
+    allowed_urls = ()
+
+    # With the elide_navigation option set, a selector or locator that must be on the page
+    # for `open` and `go_to` to consider the browser already there.
+    identity_selector = None
+
     def __init__(self):
         """
         Initializes the pageobject_name variable, which is used by the _Keywords class
@@ -152,6 +174,32 @@ class Page(_BaseActions, _SelectorsManager, _ComponentsManager):
             setattr(self, sauce_opt, self._option_handler.get(sauce_opt))
 
         self._attempt_sauce = self._validate_sauce_options()
+        # A WebDriver server to run browsers on, like a Selenium grid hub or a
+        # `robotpageobjects.hub.LocalHub`. With Sauce, it defaults to Sauce's.
+        self.remote_url = self._option_handler.get("remote_url")
+
+        self.page_load_strategy = self._option_handler.get("page_load_strategy")
+        if self.page_load_strategy not in (None, "", "normal", "eager", "none"):
+            raise ValueError("page_load_strategy must be \"normal\", \"eager\" or \"none\", not \"%s\"."
+                             % self.page_load_strategy)
+        page_load_timeout = self._option_handler.get("page_load_timeout")
+        self.page_load_timeout = robot.utils.timestr_to_secs(page_load_timeout) if page_load_timeout else None
+
+        self.blocked_urls = self._get_resource_patterns("blocked_urls")
+        self.blocked_content_types = self._get_resource_patterns("blocked_content_types")
+        self.allowed_urls = self._get_resource_patterns("allowed_urls")
+        self._proxy = self._get_proxy()
+
+        self.elide_navigation = self._option_handler.get_bool("elide_navigation")
+        self._navigations_skipped = 0
+
+        self._session_store = None
+        if self._option_handler.get_bool("reuse_session"):
+            self._session_store = SessionStore(self._get_session_state_path())
+
+        self._browser_pool = self._get_browser_pool()
+        if self._browser_pool is not None and self._option_handler.get_bool("prelaunch_browser"):
+            self._prelaunch_browser()
 
         # There's only a session ID when using a remote webdriver (Sauce, for example)
         self.session_id = None
@@ -355,6 +403,38 @@ class Page(_BaseActions, _SelectorsManager, _ComponentsManager):
     def _parse_service_args(self, service_args):
         return [arg.strip() for arg in service_args.split(" ") if arg.strip() != ""]
 
+    def _get_resource_patterns(self, name):
+        """
+        Gets the page object's patterns for blocking resources, plus those
+        of the option of the same name, separated by spaces.
+        """
+        patterns = self._option_handler.get(name) or []
+        if isinstance(patterns, basestring):
+            patterns = patterns.split()
+        return list(getattr(self.__class__, name)) + list(patterns)
+
+    def _get_proxy(self):
+        """
+        Gets the filtering proxy shared by all page objects, starting it if this page object
+        blocks any resources or the replay_mode option is set. Remote browsers (on Sauce or at
+        the remote_url) may not be able to reach it, so they never use it. See `robotpageobjects.proxy.FilteringProxy` and
+        `robotpageobjects.replay`.
+        """
+        replay_mode = self._option_handler.get("replay_mode")
+        if replay_mode not in (None, "", "record", "replay"):
+            raise ValueError("replay_mode must be \"record\" or \"replay\", not \"%s\"." % replay_mode)
+
+        proxy = Context.get_proxy()
+        if (proxy is None and not self._attempt_sauce and not self.remote_url and
+                (self.blocked_urls or self.blocked_content_types or replay_mode)):
+            proxy = FilteringProxy()
+            proxy.start()
+            Context.set_proxy(proxy)
+        if proxy is not None and replay_mode and proxy.archive is None:
+            path = self._option_handler.get("replay_archive") or "po_replay_archive.dat"
+            proxy.set_archive(ReplayArchive(os.path.abspath(path)), replay_mode)
+        return proxy
+
     def _validate_sauce_options(self):
         """
         Check if user wants to use sauce and make sure all required options are given
@@ -496,25 +576,180 @@ class Page(_BaseActions, _SelectorsManager, _ComponentsManager):
         """
         return re.match("^(\w+:(\d+)?)\/\/", url) is not None
 
+    @staticmethod
+    def _normalize_url(url):
+        """
+        Normalizes a URL the way browsers report their location, for comparing with it.
+        """
+        parts = urlparse.urlsplit(url)
+        return urlparse.urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/",
+                                    parts.query, parts.fragment))
+
+    def _is_at(self, url):
+        """
+        With the elide_navigation option set, checks whether the browser has already
+        loaded `url`, and the identity_selector, if set, is on the page.
+        :returns: bool
+        """
+        if not self.elide_navigation or not self._cache:
+            return False
+        try:
+            ready_state, href = self._current_browser().execute_script(
+                "return [document.readyState, window.location.href];")
+        except WebDriverException:
+            return False
+        if ready_state != "complete" or self._normalize_url(href) != self._normalize_url(url):
+            return False
+        if self.identity_selector is not None and \
+                self._element_find(self.identity_selector, True, False, wait=0) is None:
+            return False
+        self._navigations_skipped += 1
+        self.log("Already at %s, skipping navigation." % url, "DEBUG", is_console=False)
+        return True
+
+    @not_keyword
+    def get_navigations_skipped(self):
+        """
+        Gets how many times `open` and `go_to` didn't navigate because the browser was already
+        at the page, with the elide_navigation option set.
+        :returns: int
+        """
+        return self._navigations_skipped
+
+    @not_keyword
+    def get_remote_connection_stats(self):
+        """
+        Gets how the current remote browser's connections to its server were used: the number of
+        requests sent, connections opened, requests that reused a connection, and commands
+        pipelined. See `robotpageobjects.connectionpool.PooledRemoteConnection`.
+        :returns: dict, or None if the browser isn't remote
+        """
+        executor = getattr(self._cache.current, "command_executor", None)
+        if isinstance(executor, ThreadLocalConnections):
+            executor = executor.connection
+        return executor.get_stats() if isinstance(executor, PooledRemoteConnection) else None
+
+    def log_browser_launch_summary(self):
+        """
+        Logs how many browsers this process launched, how long launches took and why attempts
+        failed. Meant for a suite teardown. See `robotpageobjects.launcher.DriverLauncher`.
+        :returns: None
+        """
+        self.log(DriverLauncher.format_summary(), "INFO")
+        return self
+
     def go_to(self, *args):
         """
         Wrapper to make go_to method support uri templates.
+        With the elide_navigation option set, does nothing if the browser is already at the URL.
         """
         resolved_url = self._resolve_url(*args)
+        if self._is_at(resolved_url):
+            return self
         super(_BaseActions, self).go_to(resolved_url)
+        self._install_browser_error_sentinel()
         return self
 
+    def _get_launcher(self):
+        """
+        Gets the launcher every browser is started with.
+        See `robotpageobjects.launcher.DriverLauncher`.
+        """
+        attempts = int(self._option_handler.get("browser_launch_attempts") or 6)
+        return DriverLauncher(attempts, log=lambda msg, level: self.log(msg, level, is_console=False))
+
+    def _get_local_launch_args(self, webdriver_type, desired_cap_type):
+        """
+        Gets the constructor arguments for a local browser: the service args, the page load
+        strategy, and the settings for going through the filtering proxy, if it's running.
+        """
+        kwargs = {"service_args": list(self.service_args)}
+        capabilities = self._add_page_load_strategy(desired_cap_type.copy())
+        if self._proxy is not None and self._proxy.port is not None:
+            if webdriver_type is webdriver.PhantomJS:
+                # PhantomJS ignores the proxy capability.
+                kwargs["service_args"] += ["--proxy=%s" % self._proxy.address, "--proxy-type=http"]
+            else:
+                proxy = Proxy()
+                proxy.proxy_type = ProxyType.MANUAL
+                proxy.http_proxy = proxy.ssl_proxy = self._proxy.address
+                proxy.add_to_capabilities(capabilities)
+        if capabilities != desired_cap_type:
+            kwargs["desired_capabilities"] = capabilities
+        return kwargs
+
+    def _add_page_load_strategy(self, capabilities):
+        """
+        Sets the pageLoadStrategy capability from the page_load_strategy option, if it's set.
+        :returns: The capabilities
+        """
+        if self.page_load_strategy:
+            capabilities["pageLoadStrategy"] = self.page_load_strategy
+        return capabilities
+
     def _generic_make_browser(self, webdriver_type, desired_cap_type, remote_url, desired_caps):
         """Override Selenium2Library's _generic_make_browser to allow for extra params
-        to driver constructor."""
-        kwargs = {}
+        to driver constructor, and to launch through our launcher."""
         if not remote_url:
-            if 'service_args' in inspect.getargspec(webdriver_type.__init__).args:
-                kwargs['service_args'] = self.service_args
-            browser = webdriver_type(**kwargs)
+            return self._get_launcher().launch(webdriver_type,
+                                               **self._get_local_launch_args(webdriver_type, desired_cap_type))
+        return self._create_remote_web_driver(desired_cap_type, remote_url, desired_caps)
+
+    def _make_ff(self, remote, desired_capabilities, profile_dir):
+        """Override Selenium2Library's _make_ff to launch through our launcher."""
+        profile = webdriver.FirefoxProfile(profile_dir or FIREFOX_PROFILE_DIR)
+        if remote:
+            return self._create_remote_web_driver(webdriver.DesiredCapabilities.FIREFOX, remote,
+                                                  desired_capabilities, profile)
+        return self._get_launcher().launch(webdriver.Firefox, firefox_profile=profile,
+                                           **self._get_local_launch_args(webdriver.Firefox,
+                                                                         webdriver.DesiredCapabilities.FIREFOX))
+
+    def _create_remote_web_driver(self, capabilities_type, remote_url, desired_capabilities=None, profile=None):
+        """Override Selenium2Library's _create_remote_web_driver to launch through our launcher."""
+        capabilities = capabilities_type.copy()
+        if isinstance(desired_capabilities, basestring):
+            desired_capabilities = self._parse_capabilities_string(desired_capabilities)
+        capabilities.update(desired_capabilities or {})
+        self._add_page_load_strategy(capabilities)
+        executor = PooledRemoteConnection(str(remote_url),
+                                          pipelining=self._option_handler.get_bool("remote_pipelining"))
+        return self._get_launcher().launch(webdriver.Remote, command_executor=executor,
+                                           desired_capabilities=capabilities, browser_profile=profile)
+
+    def _get_browser_pool(self):
+        """
+        Gets the browser pool shared by all page objects, if the browser_pool_size option is set.
+        See `robotpageobjects.browserpool.BrowserPool`.
+        """
+        size = int(self._option_handler.get("browser_pool_size") or 0)
+        # Prelaunched browsers are handed over through the pool, even if none are kept.
+        if not size and not self._option_handler.get_bool("prelaunch_browser"):
+            return None
+        max_uses = self._option_handler.get("browser_pool_max_uses")
+        max_uses = int(max_uses) if max_uses else None
+        pool = Context.get_browser_pool()
+        if pool is None:
+            pool = BrowserPool(size, max_uses)
+            Context.set_browser_pool(pool)
         else:
-            browser = self._create_remote_web_driver(desired_cap_type, remote_url, desired_caps)
-        return browser
+            pool.size, pool.max_uses = size, max_uses
+        return pool
+
+    def _prelaunch_browser(self):
+        """
+        Starts creating a browser in the background, for `open` to pick up, unless a browser is
+        already open or being prelaunched, or we're going to use a remote browser or reuse a session.
+        See `robotpageobjects.browserpool.BrowserPool.prelaunch`.
+        """
+        # Reused sessions don't come from the pool, so a prelaunched browser would go to waste.
+        if (self._session_store is not None or self._attempt_sauce or self.remote_url or self._cache.current or
+                self._browser_pool.is_launching(self.browser)):
+            return
+        creation_func = self._get_browser_creation_function(self.browser)
+        if not creation_func:
+            return
+        self._browser_pool.prelaunch(self.browser, lambda: creation_func(None, None, None))
 
     def _make_browser(self, browser_name, desired_capabilities=None, profile_dir=None, remote=None):
         creation_func = self._get_browser_creation_function(browser_name)
@@ -522,10 +757,29 @@ class Page(_BaseActions, _SelectorsManager, _ComponentsManager):
         if not creation_func:
             raise ValueError(browser_name + " is not a supported browser.")
 
-        browser = creation_func(remote, desired_capabilities, profile_dir)
+        # Remote browsers, like Sauce's, aren't pooled, and neither are reused sessions.
+        pool = self._browser_pool if not remote and self._session_store is None else None
+        browser = None
+        if self._session_store is not None:
+            browser = self._session_store.attach(browser_name, remote)
+            if browser is not None:
+                self.log("Attached to session %s." % browser.session_id, is_console=False)
+        elif pool is not None:
+            browser = pool.checkout(browser_name)
+            # A browser closed into the pool is still marked closed in the cache,
+            # which would keep close_all_browsers from handing it back.
+            self._set_browser_closed(browser, False)
+        if browser is None:
+            browser = creation_func(remote, desired_capabilities, profile_dir)
+            if pool is not None:
+                pool.track(browser_name, browser)
+            elif self._session_store is not None:
+                self._session_store.save(browser_name, remote, browser)
         browser.set_speed(self._speed_in_secs)
         browser.set_script_timeout(self._timeout_in_secs)
         browser.implicitly_wait(self._implicit_wait_in_secs)
+        if self.page_load_timeout is not None:
+            browser.set_page_load_timeout(self.page_load_timeout)
         return browser
 
     def open(self, *args):
@@ -555,14 +809,31 @@ class Page(_BaseActions, _SelectorsManager, _ComponentsManager):
 
         If no `uri_var` is passed the page object tries to open the browser at its uri attribute.
 
+        With the elide_navigation option set, if a browser is open and has finished loading the
+        URL (and the page object's `identity_selector`, if any, is on the page), `open` does nothing.
+
 
         :param delete_cookies: If set to True, deletes browser's cookies when called.
         :type delete_cookies: Boolean
         :returns: _BaseActions instance
         """
         resolved_url = self._resolve_url(*args)
+
+        if self._proxy is not None:
+            # The proxy outlives suites, so it gets the rules of whichever page object opened last.
+            self._proxy.set_rules(self.blocked_urls, self.blocked_content_types, self.allowed_urls)
+
+        if not self._is_robot and self.test_time_budget:
+            # Outside Robot there's no notion of the current test, so opening a
+            # browser starts a new time budget.
+            Context.set_deadline(None)
+
+        if self._is_at(resolved_url):
+            return self
+
         if self._attempt_sauce:
-            remote_url = "http://%s:%s@ondemand.saucelabs.com:80/wd/hub" % (self.sauce_username, self.sauce_apikey)
+            remote_url = self.remote_url or "http://%s:%s@ondemand.saucelabs.com:80/wd/hub" % (
+                self.sauce_username, self.sauce_apikey)
             caps = getattr(webdriver.DesiredCapabilities, self.browser.upper())
             caps["platform"] = self.sauce_platform
             if self.sauce_browserversion:
@@ -590,9 +861,15 @@ class Page(_BaseActions, _SelectorsManager, _ComponentsManager):
             self.session_id = self.get_current_browser().session_id
             self.log("session ID: %s" % self.session_id)
 
+        elif self.remote_url:
+            self.open_browser(resolved_url, self.browser, remote_url=self.remote_url)
+            self.session_id = self.get_current_browser().session_id
+            self.log("session ID: %s" % self.session_id)
+
         else:
             self.open_browser(resolved_url, self.browser)
 
+        self._install_browser_error_sentinel()
         self.log("PO_BROWSER: %s" % (str(self.get_current_browser())), is_console=False)
 
         return self
@@ -600,7 +877,167 @@ class Page(_BaseActions, _SelectorsManager, _ComponentsManager):
     def close(self):
         """
         Wrapper for Selenium2Library's close_browser.
+        If the browser_pool_size option is set, the browser is returned to the pool
+        instead of being quit. If the reuse_session option is set, the browser is left
+        open for the next process to attach to.
+        :returns: None
+        """
+        browser = self._cache.current
+        if not browser or not self._release_browser(browser):
+            self.close_browser()
+        return self
+
+    def close_all_browsers(self):
+        """
+        Wrapper for Selenium2Library's close_all_browsers. Like `close`, it returns
+        pooled browsers to the pool and leaves reused sessions open.
+        :returns: None
+        """
+        # A pooled browser that was closed and checked out again is in the cache twice.
+        for browser in set(self._cache.get_open_browsers()):
+            self._release_browser(browser)
+        super(Page, self).close_all_browsers()
+        return self
+
+    def quit_reused_session(self):
+        """
+        Quits the browser session recorded for `reuse_session`, stops its local driver,
+        and forgets the session, so the next run starts a new one.
         :returns: None
         """
-        self.close_browser()
+        store = self._session_store or SessionStore(self._get_session_state_path())
+        for browser in set(self._cache.get_open_browsers()):
+            if store.is_recorded(browser):
+                self._set_browser_closed(browser)
+        store.quit()
         return self
+
+    def _get_session_state_path(self):
+        """
+        The path of the `reuse_session` state file. Relative paths are resolved against
+        Robot's output directory.
+        """
+        path = self._option_handler.get("session_state_file") or ".po_session.json"
+        return os.path.abspath(os.path.join(Context.get_output_dir(), path))
+
+    def _release_browser(self, browser):
+        """
+        Returns a pooled browser to the pool, or leaves a reused session open, marking
+        it closed in the browser cache.
+        :returns: bool, whether the browser was pooled or reused, as opposed to needing to be quit
+        """
+        if self._browser_pool is not None and self._browser_pool.is_tracked(browser):
+            self._set_browser_closed(browser)
+            self._browser_pool.checkin(browser)
+        elif self._session_store is not None and self._session_store.is_recorded(browser):
+            self._set_browser_closed(browser)
+        else:
+            return False
+        return True
+
+    def _set_browser_closed(self, browser, closed=True):
+        """
+        Marks a browser closed (or open again) in Selenium2Library's browser cache without
+        quitting it, the way BrowserCache.close marks the browsers it quits. A closed browser
+        stops being the current one. Selenium2Library has no API for this, so this depends on
+        BrowserCache's private `_closed` set and `_no_current` placeholder; check it when
+        upgrading Selenium2Library.
+        """
+        if not closed:
+            self._cache._closed.discard(browser)
+            return
+        self._cache._closed.add(browser)
+        if self._cache.current is browser:
+            self._cache.current = self._cache._no_current
+            # A plain attribute in older Robot versions, derived from `current` in newer ones.
+            self._cache.current_index = None
+
+    @not_keyword
+    def iter_components(self, component_class, next_page, limit=None, max_pages=None, fields=None, timeout=None,
+                        loaded=None):
+        """
+        Iterates over a component's instances across paginated pages, such as search results.
+        Components are built one at a time as they're consumed. When the components on one page
+        run out, the next page is loaded and iteration continues there. Iteration stops at a
+        page without components.
+
+        The next page has loaded when the first component's reference element goes stale, as when
+        the page is replaced, or changes, as when the list is rendered again in place.
+
+        :param component_class: The page component class
+        :param next_page: The selector or locator of the "next page" link or button, which is
+                          clicked to get to the next page. Iteration stops when it isn't there,
+                          visible or enabled. Can also be a callable that goes to the next page
+                          and returns a false value when there is none.
+        :type next_page: str or callable
+        :param limit: The maximum number of components to yield
+        :type limit: int
+        :param max_pages: The maximum number of pages to visit
+        :type max_pages: int
+        :param fields: If given, yields a dictionary of values per component, read with one
+                       call to the browser per page, instead of components.
+                       See `robotpageobjects.component.Component.snapshot`.
+        :type fields: dict or list
+        :param timeout: How long to wait for the next page, defaults to the selenium implicit wait
+        :param loaded: If given, a callable taking no arguments that returns a true value once the
+                       next page has loaded, for pages where that can't be told from the components
+        :type loaded: callable
+        :returns: generator
+
+        Usage::
+
+            for result in search_results_page.iter_components(ResultComponent, "next page link", limit=200):
+                ...
+        """
+        locator = self._get_component_locator(component_class)
+        yielded = 0
+        pages = 0
+        while limit is None or yielded < limit:
+            collection = self.get_collection(component_class)
+            pages += 1
+            items = iter(collection) if fields is None else collection.snapshot(fields)
+            on_page = 0
+            for item in items:
+                yield item
+                yielded += 1
+                on_page += 1
+                if limit is not None and yielded >= limit:
+                    return
+            if not on_page:
+                return
+            if max_pages is not None and pages >= max_pages:
+                return
+            if not self._go_to_next_page(next_page, locator, timeout, loaded):
+                return
+
+    def _go_to_next_page(self, next_page, locator, timeout=None, loaded=None):
+        """
+        Goes to the next page of paginated components, then waits for it to load.
+        See `iter_components`.
+        :param locator: The components' locator
+        :returns: bool, whether there was a next page
+        """
+        if loaded is None:
+            # The document's root element stands in if the components are gone already.
+            marker = (self._element_find(locator, True, False, wait=0) or
+                      self._element_find("tag=html", True, False, wait=0))
+            before = marker.get_attribute("outerHTML")
+
+            def loaded():
+                try:
+                    return marker.get_attribute("outerHTML") != before
+                except StaleElementReferenceException:
+                    return True
+
+        if callable(next_page):
+            if not next_page():
+                return False
+        else:
+            link = self._element_find(next_page, True, False, wait=0)
+            if link is None or not link.is_displayed() or not link.is_enabled():
+                return False
+            link.click()
+
+        self.wait_for(loaded, timeout=timeout, message="The next page didn't load.")
+        self._install_browser_error_sentinel()
+        return True
@@ -0,0 +1,279 @@
+"""
+A lightweight HTTP proxy, run in-process, that the browser is pointed at so page loads
+can be trimmed down to what the tests need.
+
+Requests are matched against URL patterns (shell-style, like "*.png" or
+"*google-analytics.com*") and responses against content type patterns (like "image/*"
+or "font/*"). Blocked requests never leave the machine and get an empty response, and
+responses of blocked content types are replaced by empty ones of the same type. URL patterns
+in the allow list win over everything else.
+
+HTTPS requests are tunneled through without being decrypted, so for them only the host
+can be matched: a URL pattern blocks an HTTPS host if it matches "https://host/".
+
+The proxy can also record responses to an archive, or answer from one.
+See :mod:`robotpageobjects.replay`.
+"""
+import BaseHTTPServer
+import SocketServer
+import fnmatch
+import httplib
+import select
+import socket
+import threading
+import urlparse
+
+
+# Headers that apply to a single connection, and mustn't be forwarded.
+_HOP_BY_HOP = ("connection", "keep-alive", "proxy-connection", "proxy-authenticate", "proxy-authorization",
+               "te", "trailers", "transfer-encoding", "upgrade")
+
+
+class ProxyResponse(object):
+    """
+    A response to send back to the browser.
+    """
+
+    def __init__(self, status, reason, headers, body):
+        """
+        :param status: The HTTP status code
+        :param reason: The HTTP reason phrase
+        :param headers: list of (name, value) tuples
+        :param body: The response body
+        :type body: str
+        """
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def get_header(self, name, default=None):
+        for header, value in self.headers:
+            if header.lower() == name.lower():
+                return value
+        return default
+
+
+class FilteringProxy(object):
+    """
+    Forwards the browser's requests, dropping the ones matching the blocking rules.
+    """
+
+    # How long to wait for upstream servers, in seconds.
+    timeout = 30
+
+    def __init__(self, blocked_urls=(), blocked_content_types=(), allowed_urls=()):
+        self.set_rules(blocked_urls, blocked_content_types, allowed_urls)
+        self.stats = {"requests": 0, "blocked": 0, "replayed": 0, "missed": 0}
+        self.archive = None
+        self.replay_mode = None
+        self._server = None
+
+    def set_rules(self, blocked_urls=(), blocked_content_types=(), allowed_urls=()):
+        """
+        Replaces the blocking rules. They apply to requests made from then on.
+        """
+        self.blocked_urls = list(blocked_urls)
+        self.blocked_content_types = list(blocked_content_types)
+        self.allowed_urls = list(allowed_urls)
+
+    def set_archive(self, archive, mode):
+        """
+        Starts recording responses to an archive, or answering from one.
+        :param archive: The archive, or None to go back to forwarding requests
+        :type archive: robotpageobjects.replay.ReplayArchive
+        :param mode: "record" or "replay"
+        """
+        if self.archive is not None and self.archive is not archive:
+            self.archive.close()
+        self.archive = archive
+        self.replay_mode = mode if archive is not None else None
+
+    @staticmethod
+    def _matches(value, patterns):
+        return any(fnmatch.fnmatch(value, pattern) for pattern in patterns)
+
+    def is_url_blocked(self, url):
+        return self._matches(url, self.blocked_urls) and not self._matches(url, self.allowed_urls)
+
+    def is_content_type_blocked(self, url, content_type):
+        if not content_type or self._matches(url, self.allowed_urls):
+            return False
+        return self._matches(content_type.split(";")[0].strip().lower(), self.blocked_content_types)
+
+    def handle(self, method, url, headers, body):
+        """
+        Handles one request from the browser.
+        :param headers: list of (name, value) tuples, without hop-by-hop headers
+        :returns: ProxyResponse
+        """
+        self.stats["requests"] += 1
+        if self.is_url_blocked(url):
+            self.stats["blocked"] += 1
+            return ProxyResponse(204, "No Content", [("Content-Length", "0")], "")
+        if self.replay_mode == "replay":
+            response = self.replay(method, url, body)
+        elif self.replay_mode == "record":
+            # Responses of blocked content types are recorded in full too, so the archive
+            # doesn't depend on the rules.
+            response = self.fetch(method, url, headers, body, drop_blocked=False)
+            self.archive.record(method, url, body, response.status, response.reason,
+                                response.headers, response.body)
+        else:
+            return self.fetch(method, url, headers, body)
+        return self._get_blocked_response(url, response.get_header("Content-Type")) or response
+
+    def _get_blocked_response(self, url, content_type):
+        """
+        Gets the empty response replacing a response of a blocked content type.
+        :returns: ProxyResponse, or None if the content type isn't blocked
+        """
+        if not self.is_content_type_blocked(url, content_type):
+            return None
+        self.stats["blocked"] += 1
+        return ProxyResponse(200, "OK", [("Content-Type", content_type), ("Content-Length", "0")], "")
+
+    def fetch(self, method, url, headers, body, drop_blocked=True):
+        """
+        Sends a request to its server.
+        :param drop_blocked: Whether to replace a response of a blocked content type with an
+                             empty one as soon as its headers arrive, without reading the body
+        :returns: ProxyResponse
+        """
+        parts = urlparse.urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        conn = httplib.HTTPConnection(parts.hostname, parts.port or 80, timeout=self.timeout)
+        try:
+            conn.putrequest(method, path, skip_host=True, skip_accept_encoding=True)
+            for name, value in headers:
+                conn.putheader(name, value)
+            if body and not any(name.lower() == "content-length" for name, value in headers):
+                conn.putheader("Content-Length", str(len(body)))
+            conn.endheaders(body or None)
+            resp = conn.getresponse()
+            if drop_blocked:
+                blocked = self._get_blocked_response(url, resp.getheader("Content-Type"))
+                if blocked is not None:
+                    resp.close()
+                    return blocked
+            return ProxyResponse(resp.status, resp.reason,
+                                 [(name, value) for name, value in resp.getheaders()
+                                  if name.lower() not in _HOP_BY_HOP], resp.read())
+        finally:
+            conn.close()
+
+    def replay(self, method, url, body):
+        """
+        Answers a request from the archive.
+        :returns: ProxyResponse
+        """
+        recorded = self.archive.lookup(method, url, body)
+        if recorded is None:
+            self.stats["missed"] += 1
+            message = "%s %s isn't in the replay archive." % (method, url)
+            return ProxyResponse(404, "Not Found", [("Content-Type", "text/plain")], message)
+        self.stats["replayed"] += 1
+        return ProxyResponse(*recorded)
+
+    def is_tunnel_blocked(self, host, port):
+        # Tunneled traffic can't be replayed, so there's none in replay mode.
+        if self.replay_mode == "replay":
+            return True
+        url = "https://%s/" % host if port == 443 else "https://%s:%s/" % (host, port)
+        return self.is_url_blocked(url)
+
+    def start(self):
+        """
+        Starts serving on a free local port, in a background thread.
+        :returns: The port
+        """
+        self._server = _ThreadingHTTPServer(("127.0.0.1", 0), _ProxyHandler)
+        self._server.proxy = self
+        thread = threading.Thread(target=self._server.serve_forever, name="robotpageobjects-proxy")
+        thread.daemon = True
+        thread.start()
+        return self.port
+
+    @property
+    def port(self):
+        return self._server.server_address[1] if self._server is not None else None
+
+    @property
+    def address(self):
+        return "127.0.0.1:%s" % self.port
+
+    def stop(self):
+        self.set_archive(None, None)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class _ProxyHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # One request per connection keeps the proxy simple.
+    protocol_version = "HTTP/1.0"
+
+    def _handle(self):
+        proxy = self.server.proxy
+        if not self.path.startswith("http://"):
+            self.send_error(400, "Only proxy requests for http:// URLs are supported")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else ""
+        headers = [(name, value.strip()) for name, value in
+                   (line.split(":", 1) for line in self.headers.headers if ":" in line)
+                   if name.lower() not in _HOP_BY_HOP]
+        try:
+            response = proxy.handle(self.command, self.path, headers, body)
+        except (socket.error, httplib.HTTPException) as e:
+            self.send_error(502, "Couldn't reach %s: %s" % (self.path, e))
+            return
+        self.send_response(response.status, response.reason)
+        for name, value in response.headers:
+            if name.lower() != "content-length":
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(response.body)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(response.body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_OPTIONS = do_PATCH = _handle
+
+    def do_CONNECT(self):
+        host, _, port = self.path.partition(":")
+        port = int(port or 443)
+        if self.server.proxy.is_tunnel_blocked(host, port):
+            self.server.proxy.stats["blocked"] += 1
+            self.send_error(403, "Blocked")
+            return
+        try:
+            upstream = socket.create_connection((host, port), timeout=self.server.proxy.timeout)
+        except socket.error as e:
+            self.send_error(502, "Couldn't reach %s: %s" % (self.path, e))
+            return
+        self.send_response(200, "Connection established")
+        self.end_headers()
+        sockets = [self.connection, upstream]
+        try:
+            while True:
+                readable, _, errored = select.select(sockets, [], sockets, self.server.proxy.timeout)
+                if errored or not readable:
+                    break
+                for sock in readable:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    (upstream if sock is self.connection else self.connection).sendall(data)
+        finally:
+            upstream.close()
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,119 @@
+"""
+Records the responses a browser gets, and plays them back later without the network.
+
+With the `replay_mode` option set to "record", the filtering proxy (see
+:mod:`robotpageobjects.proxy`) forwards requests as usual and saves each response in
+an archive, keyed by the request's method, URL and a hash of its body. With `replay_mode` set
+to "replay", it answers requests from the archive only. Requests that weren't recorded get a
+404, so a suite run in replay mode never waits on a backend.
+
+An archive is two files: the data file, named by the `replay_archive` option, holds the
+response bodies back to back, and "<data file>.idx" is a JSON index of each response's
+status, headers, and body offset and length. The data file is memory-mapped for replay.
+
+Only plain HTTP is recorded. HTTPS goes through the proxy encrypted, so it can't be.
+"""
+import atexit
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+
+def get_request_key(method, url, body):
+    """
+    Identifies a request in an archive.
+    """
+    body_hash = hashlib.sha1(body or "").hexdigest()
+    return hashlib.sha1("%s %s %s" % (method.upper(), url, body_hash)).hexdigest()
+
+
+class ReplayArchive(object):
+    """
+    An archive of recorded responses.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The data file's path. The index is next to it.
+        :type path: str
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self._lock = threading.Lock()
+        self._index = None
+        self._data = None
+        self._map = None
+        self._save_at_exit = False
+
+    def _get_index(self):
+        if self._index is None:
+            if os.path.exists(self.index_path):
+                with open(self.index_path) as f:
+                    self._index = json.load(f)
+            else:
+                self._index = {}
+        return self._index
+
+    def __len__(self):
+        return len(self._get_index())
+
+    def __contains__(self, key):
+        return key in self._get_index()
+
+    def record(self, method, url, body, status, reason, headers, response_body):
+        """
+        Saves a response. A later response to the same request replaces it.
+        :param headers: The response's headers, as a list of (name, value) tuples
+        """
+        with self._lock:
+            index = self._get_index()
+            if self._data is None:
+                self._data = open(self.path, "ab")
+                if not self._save_at_exit:
+                    atexit.register(self.save)
+                    self._save_at_exit = True
+            self._data.seek(0, os.SEEK_END)
+            offset = self._data.tell()
+            self._data.write(response_body)
+            self._data.flush()
+            index[get_request_key(method, url, body)] = {
+                "method": method, "url": url, "status": status, "reason": reason,
+                "headers": headers, "offset": offset, "length": len(response_body)}
+
+    def lookup(self, method, url, body):
+        """
+        Gets a recorded response.
+        :returns: A (status, reason, headers, body) tuple, or None if the request wasn't recorded
+        """
+        entry = self._get_index().get(get_request_key(method, url, body))
+        if entry is None:
+            return None
+        with self._lock:
+            if entry["length"] and self._map is None:
+                with open(self.path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            body = self._map[entry["offset"]:entry["offset"] + entry["length"]] if entry["length"] else ""
+        return entry["status"], entry["reason"], [tuple(header) for header in entry["headers"]], body
+
+    def save(self):
+        """
+        Writes the index, if anything was recorded.
+        """
+        with self._lock:
+            if self._data is None:
+                return
+            self._data.close()
+            self._data = None
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._index, f)
+            os.rename(tmp_path, self.index_path)
+
+    def close(self):
+        self.save()
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
@@ -0,0 +1,162 @@
+"""
+Lets a browser session outlive the process that started it.
+
+With the `reuse_session` option set, the first page object to open a browser records the
+session's ID and the URL of the driver it runs on in a state file, and leaves the driver
+running when the process ends. Page objects in later processes (the next `python test_x.py`
+or pybot run) attach to that session instead of starting a browser, as long as it's for the
+same browser and still responds. Otherwise, a new session is started and recorded.
+
+The process ID of a local driver is recorded too, so the driver can be stopped when its
+session no longer responds, or when the session is quit with :meth:`SessionStore.quit`
+(the `quit_reused_session` keyword).
+"""
+import errno
+import json
+import os
+import signal
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from .launcher import _TRANSIENT_ERRORS
+
+
+class AttachedRemote(webdriver.Remote):
+    """
+    A WebDriver for a session that already exists. It doesn't request a new session.
+    """
+
+    def __init__(self, command_executor, session_id, capabilities=None, w3c=False):
+        """
+        :param command_executor: The URL of the driver or server the session runs on
+        :param session_id: The session's ID
+        :param capabilities: The session's capabilities
+        :param w3c: Whether the session speaks the W3C protocol, as opposed to the older JSON wire protocol
+        """
+        self._attach_to = (session_id, dict(capabilities or {}), w3c)
+        super(AttachedRemote, self).__init__(command_executor=command_executor, desired_capabilities={})
+
+    def start_session(self, capabilities, browser_profile=None):
+        self.session_id, self.capabilities, self.w3c = self._attach_to
+        self.command_executor.w3c = self.w3c
+
+
+class SessionStore(object):
+    """
+    Reads and writes the state file describing the session to reuse.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The state file's path
+        :type path: str
+        """
+        self.path = path
+
+    def load(self):
+        """
+        :returns: The recorded session as a dict, or None if there's none
+        """
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def save(self, browser_name, remote_url, driver):
+        """
+        Records a session, and detaches it from this process so its driver keeps running.
+        """
+        service = getattr(driver, "service", None)
+        process = getattr(service, "process", None)
+        self.detach(driver)
+        state = {"browser": browser_name, "remote_url": remote_url, "session_id": driver.session_id,
+                 "executor_url": driver.command_executor._url, "capabilities": driver.capabilities,
+                 "w3c": driver.w3c, "pid": getattr(process, "pid", None),
+                 "executable": getattr(service, "path", None)}
+        with open(self.path, "w") as f:
+            json.dump(state, f)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def is_recorded(self, driver):
+        state = self.load()
+        return state is not None and state["session_id"] == driver.session_id
+
+    def attach(self, browser_name, remote_url=None):
+        """
+        Attaches to the recorded session, if it's for the given browser and it still responds.
+        A recorded session that doesn't respond is forgotten.
+        :returns: WebDriver, or None
+        """
+        state = self.load()
+        if state is None or state["browser"] != browser_name or state["remote_url"] != remote_url:
+            return None
+        try:
+            driver = self._get_driver(state)
+            if driver.execute_script("return 1;") == 1:
+                return driver
+        except (WebDriverException,) + _TRANSIENT_ERRORS:
+            # Like "invalid session id", or the driver isn't running anymore.
+            pass
+        self._stop_driver(state)
+        self.clear()
+        return None
+
+    def quit(self):
+        """
+        Quits the recorded session, if any, stops its local driver and forgets it.
+        :returns: bool, whether a session was recorded
+        """
+        state = self.load()
+        if state is None:
+            return False
+        try:
+            self._get_driver(state).quit()
+        except (WebDriverException,) + _TRANSIENT_ERRORS:
+            pass
+        self._stop_driver(state)
+        self.clear()
+        return True
+
+    @staticmethod
+    def _get_driver(state):
+        return AttachedRemote(str(state["executor_url"]), state["session_id"], state["capabilities"], state["w3c"])
+
+    @staticmethod
+    def _stop_driver(state):
+        """
+        Stops the recorded local driver process, if it's still running. On systems with /proc, a
+        process is only stopped if it's running the recorded executable, in case the ID was reused.
+        """
+        pid = state.get("pid")
+        if not pid:
+            return
+        executable = state.get("executable")
+        cmdline_path = "/proc/%s/cmdline" % pid
+        if executable and os.path.exists("/proc"):
+            try:
+                with open(cmdline_path) as f:
+                    if os.path.basename(executable) not in f.read():
+                        return
+            except IOError:
+                # Not running anymore.
+                return
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    @staticmethod
+    def detach(driver):
+        """
+        Keeps a local driver's process from being stopped when `driver` is garbage
+        collected or quit, so it outlives this process.
+        """
+        service = getattr(driver, "service", None)
+        if service is not None:
+            service.process = None
@@ -0,0 +1,148 @@
+"""
+Records how long waits and implicit-wait element lookups actually take compared
+to their configured timeouts, so timeouts can be set from data instead of guesswork.
+
+Recording is turned on by the `wait_report` option, which is the path of a file the
+report is written to when the test run ends. The ID of the process is added to the file
+name, so parallel runs (with pabot, for example) each write their own report. The report has one row per page object
+class and selector, locator or condition, with the configured timeout, the 50th, 95th
+and 99th percentiles of the time taken by waits that succeeded, the number of waits that
+timed out, and a recommended timeout.
+"""
+import atexit
+import math
+import os
+
+
+class WaitStats(object):
+    """
+    Collects wait timings for the whole test run. All state is kept on the class,
+    since waits are recorded from every page object and component.
+    """
+
+    # (page class name, target) -> list of (timeout, elapsed, succeeded)
+    _records = {}
+    _report_path = None
+
+    # Recommendations are this multiple of the 99th percentile...
+    headroom = 2.0
+    # ...rounded up to this many seconds...
+    granularity = 0.5
+    # ...and at least this long.
+    minimum = 1.0
+
+    @classmethod
+    def enable(cls, report_path):
+        """
+        Starts recording, and writes the report to `report_path` at exit.
+        """
+        if cls._report_path is None:
+            atexit.register(cls._write_report_at_exit)
+        cls._report_path = report_path
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._report_path is not None
+
+    @classmethod
+    def record(cls, page_class, target, timeout, elapsed, succeeded):
+        """
+        Records one wait.
+        :param page_class: The name of the page object or component class that waited
+        :param target: The selector, locator or condition waited for
+        :param timeout: The configured timeout, in seconds
+        :param elapsed: How long the wait took, in seconds
+        :param succeeded: Whether the wait succeeded, as opposed to timing out
+        """
+        if cls.is_enabled():
+            cls._records.setdefault((page_class, str(target)), []).append((timeout, elapsed, succeeded))
+
+    @classmethod
+    def reset(cls):
+        cls._records = {}
+
+    @staticmethod
+    def percentile(values, pct):
+        """
+        Gets the nearest-rank percentile of a list of numbers.
+        """
+        if not values:
+            return None
+        ordered = sorted(values)
+        rank = int(math.ceil(pct / 100.0 * len(ordered)))
+        return ordered[max(rank, 1) - 1]
+
+    @classmethod
+    def recommend(cls, timeout, p99):
+        """
+        Recommends a timeout given the configured one and the 99th percentile of successful waits.
+        Never recommends raising the timeout.
+        """
+        if p99 is None:
+            return timeout
+        recommended = math.ceil(p99 * cls.headroom / cls.granularity) * cls.granularity
+        return min(timeout, max(cls.minimum, recommended))
+
+    @classmethod
+    def get_summary(cls):
+        """
+        Gets a summary row per page object class and target, slowest first.
+        :returns: list of dicts
+        """
+        rows = []
+        for (page_class, target), records in cls._records.iteritems():
+            timeout = max(r[0] for r in records)
+            succeeded = [r[1] for r in records if r[2]]
+            p99 = cls.percentile(succeeded, 99)
+            rows.append({
+                "page": page_class,
+                "target": target,
+                "count": len(records),
+                "timed_out": len(records) - len(succeeded),
+                "timeout": timeout,
+                "p50": cls.percentile(succeeded, 50),
+                "p95": cls.percentile(succeeded, 95),
+                "p99": p99,
+                "recommended": cls.recommend(timeout, p99),
+            })
+        rows.sort(key=lambda row: (-(row["p99"] or 0), row["page"], row["target"]))
+        return rows
+
+    @classmethod
+    def format_report(cls):
+        """
+        Formats the summary as a plain text table.
+        """
+        def fmt(secs):
+            return "-" if secs is None else "%.2f" % secs
+
+        header = ("Page", "Selector/condition", "Count", "Timed out", "Timeout", "p50", "p95", "p99", "Recommended")
+        lines = [header]
+        for row in cls.get_summary():
+            lines.append((row["page"], row["target"], str(row["count"]), str(row["timed_out"]),
+                          fmt(row["timeout"]), fmt(row["p50"]), fmt(row["p95"]), fmt(row["p99"]),
+                          fmt(row["recommended"])))
+        widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+        return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip()
+                         for line in lines) + "\n"
+
+    @classmethod
+    def write_report(cls, path):
+        f = open(path, "w")
+        try:
+            f.write(cls.format_report())
+        finally:
+            f.close()
+
+    @staticmethod
+    def get_process_report_path(path):
+        """
+        Adds the current process ID to a report path, as in "waits.1234.txt" for "waits.txt".
+        """
+        root, ext = os.path.splitext(path)
+        return "%s.%s%s" % (root, os.getpid(), ext)
+
+    @classmethod
+    def _write_report_at_exit(cls):
+        if cls._report_path and cls._records:
+            cls.write_report(cls.get_process_report_path(cls._report_path))
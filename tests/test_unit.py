@@ -1,17 +1,49 @@
+import BaseHTTPServer
+import errno
 import inspect
+import json
 import os
+import shutil
+import signal
+import socket
+import SocketServer
+import subprocess
 import sys
+import tempfile
+import threading
+import time
+import urllib2
+import warnings
+from multiprocessing.pool import ThreadPool
 from nose.tools import raises
-from mock import patch
+from mock import patch, MagicMock
 from robot.libraries.BuiltIn import BuiltIn
 from unittest import skipUnless
 import selenium
 from selenium import webdriver
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, WebDriverException, \
+    UnexpectedAlertPresentException, SessionNotCreatedException
+from Selenium2Library import Selenium2Library
 
 from basetestcase import BaseTestCase
 from robotpageobjects import exceptions
+from robotpageobjects.conditions import all_of, any_of, not_, element_present, element_visible, url_contains
+from robotpageobjects.base import ComponentsDict, _BaseActions
 from robotpageobjects.page import Page, _Keywords, Override, not_keyword
+from robotpageobjects.browserpool import BrowserPool
+from robotpageobjects.component import Component
+from robotpageobjects.componentcollection import ComponentCollection
+from robotpageobjects.connectionpool import PooledRemoteConnection
 from robotpageobjects.optionhandler import OptionHandler
+from robotpageobjects.proxy import FilteringProxy
+from robotpageobjects.replay import ReplayArchive
+from robotpageobjects.session import AttachedRemote
+from robotpageobjects.context import Context
+from robotpageobjects.hub import LocalHub, SessionScheduler
+from robotpageobjects.launcher import DriverLauncher
+from robotpageobjects.waitstats import WaitStats
 
 test_dir = os.path.dirname(os.path.realpath(__file__))
 scenario_dir = os.path.join(test_dir, "scenarios")
@@ -21,6 +53,56 @@ sys.path.append(po_dir)
 from basepageobjects import BaseHomePage, BaseResultsPage
 
 
+class ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class FixtureTestCase(BaseTestCase):
+    """
+    Base class for test cases that patch things, serve HTTP or need a page with components.
+    Everything set up is torn down after each test.
+    """
+
+    def start_patch(self, target, attribute, *args, **kwargs):
+        """
+        Patches `attribute` of `target` for the rest of the test, like `patch.object`.
+        :returns: The patched value, such as a MagicMock
+        """
+        patcher = patch.object(target, attribute, *args, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def start_server(self, handler_class, threaded=False):
+        """
+        Serves HTTP on a free local port, in a background thread, for the rest of the test.
+        :param threaded: Whether to handle each request in its own thread, as needed to
+                         keep connections open
+        :returns: The server, with its base URL as `url`
+        """
+        server_class = ThreadingHTTPServer if threaded else BaseHTTPServer.HTTPServer
+        server = server_class(("127.0.0.1", 0), handler_class)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        server.url = "http://127.0.0.1:%s" % server.server_address[1]
+        return server
+
+    @staticmethod
+    def make_page(component_class, locator, selectors=None):
+        """
+        Makes a page with one kind of component.
+        :param component_class: The component class, or the name of a new, empty one
+        :param locator: The components' locator
+        :returns: The page, and the component class
+        """
+        if isinstance(component_class, basestring):
+            component_class = type(component_class, (Component,), {})
+        page_class = type("P", (Page,), {"selectors": selectors or {}, "components": {component_class: locator}})
+        return page_class(), component_class
+
+
 class InheritFromSe2LibTestCase(BaseTestCase):
     def setUp(self):
         super(InheritFromSe2LibTestCase, self).setUp()
@@ -185,7 +267,9 @@ class SauceTestCase(BaseTestCase):
         os.environ["PO_SAUCE_PLATFORM"] = "Windows 8.1"
         self.PO.uri = "/foo"
         p = self.PO()
-        p.open()
+        # Retry without waiting.
+        with patch.object(Page, "_get_launcher", return_value=DriverLauncher(sleep=lambda seconds: None)):
+            p.open()
 
     @skipUnless(BaseTestCase.are_sauce_creds_set_for_testing(),
                 "SAUCE_USERNAME and SAUCE_APIKEY env vars must be set to test")
@@ -613,3 +697,1517 @@ class ServiceArgsTestCase(BaseTestCase):
             "--cookies-file=foo.txt", 
             "Service args is what we set it to be"
         )
+
+
+class ComposedConditionTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(ComposedConditionTestCase, self).setUp()
+
+        class P(Page):
+            selectors = {"results": "css=#results"}
+
+        self.p = P()
+        self.driver = MagicMock()
+        self.start_patch(P, "_current_browser", return_value=self.driver)
+
+    def test_leaves_evaluated_in_one_script(self):
+        self.driver.execute_script.return_value = [True, False, True]
+        cond = all_of(element_visible("results"), not_(element_present("id=spinner")), url_contains("/results"))
+        self.p.wait_for(cond, timeout=1)
+        self.assertEquals(self.driver.execute_script.call_count, 1)
+        script = self.driver.execute_script.call_args[0][0]
+        self.assertTrue("#results" in script and "spinner" in script and "/results" in script)
+
+    def test_python_predicate_is_combined(self):
+        self.driver.execute_script.return_value = [True]
+        self.p.wait_for(any_of(url_contains("/foo"), lambda: False), timeout=1)
+
+    def test_timeout_reports_unmet_conditions(self):
+        self.driver.execute_script.return_value = [True, False]
+        try:
+            self.p.wait_for(all_of(element_present("results"), url_contains("/results")), timeout=0.1)
+        except TimeoutException as e:
+            self.assertTrue("Unmet: URL contains \"/results\"" in e.msg, e.msg)
+        else:
+            self.fail("TimeoutException was not raised")
+
+
+class StaleComponentTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(StaleComponentTestCase, self).setUp()
+        self.p, self.C = self.make_page("C", "css=li")
+
+    def _stale_element(self):
+        el = MagicMock()
+        el.find_elements_by_css_selector.side_effect = StaleElementReferenceException()
+        return el
+
+    def test_stale_reference_elements_found_again_once(self):
+        old = [self._stale_element(), self._stale_element()]
+        new = [MagicMock(), MagicMock()]
+        for i, el in enumerate(new):
+            el.find_elements_by_css_selector.return_value = ["price %s" % i]
+
+        with patch.object(self.p, "get_reference_elements", side_effect=[old, new]) as get_reference_elements:
+            components = self.p.get_instances(self.C)
+            prices = [c._element_finder.find(None, "css=.price") for c in components]
+
+        self.assertEquals(prices, [["price 0"], ["price 1"]])
+        self.assertEquals(get_reference_elements.call_count, 2)
+        self.assertTrue(components[1].reference_webelement is new[1])
+
+    @raises(StaleElementReferenceException)
+    def test_stale_component_without_parent_raises(self):
+        self.C(self._stale_element())._element_finder.find(None, "css=.price")
+
+
+class LightweightComponentTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(LightweightComponentTestCase, self).setUp()
+
+        class C(Component):
+            selectors = {"price": "css=.price"}
+
+        self.p, self.C = self.make_page(C, "css=li")
+
+    def test_components_borrow_parent_state(self):
+        with patch.object(self.p, "get_reference_elements", return_value=[MagicMock(), MagicMock()]):
+            with patch.object(Selenium2Library, "__init__") as s2l_init:
+                components = self.p.get_instances(self.C)
+
+        self.assertEquals(s2l_init.call_count, 0)
+        self.assertEquals(len(components), 2)
+        for component in components:
+            self.assertTrue(component._cache is self.p._cache)
+            self.assertTrue(component._option_handler is self.p._option_handler)
+            self.assertTrue(component._element_finder._component is component)
+            self.assertEquals(component.selenium_implicit_wait, self.p.selenium_implicit_wait)
+            self.assertEquals(component.name, "C")
+        self.assertFalse(components[0].selectors is components[1].selectors)
+        self.assertEquals(components[0].selectors["price"], "css=.price")
+
+    def test_component_with_own_constructor_constructed_normally(self):
+        class D(Component):
+            def __init__(self, *args, **kwargs):
+                super(D, self).__init__(*args, **kwargs)
+                self.constructed = True
+
+        d = D._from_parent(self.p, MagicMock())
+        self.assertTrue(d.constructed)
+
+    def test_failing_keyword_runs_on_failure(self):
+        component = self.C._from_parent(self.p, MagicMock())
+        with patch.object(component, "_run_on_failure") as run_on_failure, \
+                patch.object(component, "_element_find", side_effect=ValueError("not found")):
+            self.assertRaises(ValueError, component.click_element, "css=.price")
+        self.assertEquals(run_on_failure.call_count, 1)
+
+
+class ComponentInheritanceTestCase(BaseTestCase):
+
+    def test_merged_components_reused_by_subclasses(self):
+        class A(Component):
+            pass
+
+        class B(Component):
+            pass
+
+        class Base(Page):
+            components = {A: "css=.a"}
+
+        class Middle(Base):
+            pass
+
+        merge = ComponentsDict.merge
+        calls = []
+
+        def counting_merge(self, *args, **kwargs):
+            calls.append(args)
+            return merge(self, *args, **kwargs)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            with patch.object(ComponentsDict, "merge", counting_merge):
+                class Leaf(Middle):
+                    components = {B: "css=.b"}
+
+        # Once for Middle's merged components, once for Leaf's own.
+        self.assertEquals(len(calls), 2)
+        self.assertEquals(caught, [])
+        self.assertEquals(Leaf.components, {A: "css=.a", B: "css=.b"})
+        self.assertTrue(hasattr(Leaf, "a"))
+        self.assertTrue(hasattr(Leaf, "bs"))
+
+
+class SingleComponentTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(SingleComponentTestCase, self).setUp()
+        self.p, self.SearchComponent = self.make_page("SearchComponent", "css=form")
+
+    def test_get_instance_finds_first_only(self):
+        el = MagicMock()
+        with patch.object(self.p, "_element_find", return_value=el) as element_find:
+            search = self.p.search
+        element_find.assert_called_once_with("css=form", True, False)
+        self.assertTrue(isinstance(search, self.SearchComponent))
+        self.assertTrue(search.reference_webelement is el)
+        self.assertEquals(search._index, 0)
+
+    def test_get_instance_none_when_not_found(self):
+        with patch.object(self.p, "_element_find", return_value=None):
+            self.assertEquals(self.p.get_instance(self.SearchComponent), None)
+
+    @raises(exceptions.ComponentError)
+    def test_get_instance_undefined_component(self):
+        class Other(Component):
+            pass
+        self.p.get_instance(Other)
+
+
+class ComponentCollectionTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(ComponentCollectionTestCase, self).setUp()
+        self.p, self.ResultComponent = self.make_page("ResultComponent", "css=li.result")
+        self.els = [MagicMock() for i in range(1000)]
+
+    def test_property_does_not_look_up_elements(self):
+        with patch.object(self.p, "get_reference_elements") as get_reference_elements:
+            results = self.p.results
+        self.assertTrue(isinstance(results, ComponentCollection))
+        self.assertEquals(get_reference_elements.call_count, 0)
+
+    def test_len_uses_count_query(self):
+        with patch.object(self.p, "_execute_on_root", return_value=1000) as execute_on_root:
+            with patch.object(self.p, "get_reference_elements") as get_reference_elements:
+                self.assertEquals(len(self.p.results), 1000)
+        self.assertEquals(execute_on_root.call_count, 1)
+        self.assertTrue("querySelectorAll(\"li.result\")" in execute_on_root.call_args[0][0])
+        self.assertEquals(get_reference_elements.call_count, 0)
+
+    def test_len_does_not_wait_when_none_counted(self):
+        with patch.object(self.p, "_execute_on_root", return_value=0):
+            with patch.object(self.p, "get_reference_elements") as get_reference_elements:
+                self.assertEquals(len(self.p.results), 0)
+        self.assertEquals(get_reference_elements.call_count, 0)
+
+    def test_len_looks_up_elements_when_locator_not_evaluated_in_browser(self):
+        class OtherComponent(Component):
+            pass
+
+        self.p.components[OtherComponent] = "link=Result"
+        with patch.object(self.p, "_element_find", return_value=self.els[:2]) as element_find:
+            self.assertEquals(len(self.p.get_collection(OtherComponent)), 2)
+        element_find.assert_called_once_with("link=Result", False, False)
+
+    def test_components_built_on_demand(self):
+        with patch.object(self.p, "get_reference_elements", return_value=self.els) as get_reference_elements:
+            with patch.object(self.p, "_make_component", wraps=self.p._make_component) as make_component:
+                results = self.p.results
+                first = results[0]
+                last = results[-1]
+                some = results[10:13]
+                self.assertTrue(results[0] is first)
+        self.assertEquals(get_reference_elements.call_count, 1)
+        self.assertEquals(make_component.call_count, 5)
+        self.assertTrue(first.reference_webelement is self.els[0])
+        self.assertTrue(last.reference_webelement is self.els[-1])
+        self.assertEquals(last._index, 999)
+        self.assertEquals([c._index for c in some], [10, 11, 12])
+
+    def test_iteration_streams(self):
+        with patch.object(self.p, "get_reference_elements", return_value=self.els), \
+                patch.object(self.p, "_count_elements", return_value=len(self.els)):
+            with patch.object(self.p, "_make_component", wraps=self.p._make_component) as make_component:
+                for result in self.p.results:
+                    break
+        self.assertEquals(make_component.call_count, 1)
+
+    @raises(IndexError)
+    def test_index_out_of_range(self):
+        with patch.object(self.p, "get_reference_elements", return_value=self.els[:2]):
+            self.p.results[2]
+
+    def test_empty_collection(self):
+        with patch.object(self.p, "_execute_on_root", return_value=0):
+            with patch.object(self.p, "get_reference_elements") as get_reference_elements:
+                results = self.p.results
+                self.assertEquals(len(results), 0)
+                self.assertEquals(list(results), [])
+                self.assertFalse(results)
+        self.assertEquals(get_reference_elements.call_count, 0)
+
+    def test_empty_lookup_not_required(self):
+        not_found = ValueError("Element locator 'css=li.result' did not match any elements.")
+        with patch.object(self.p, "get_reference_elements", side_effect=not_found):
+            self.assertEquals(self.p.results[:], [])
+
+    def test_list_protocol(self):
+        with patch.object(self.p, "get_reference_elements", return_value=self.els[:3]), \
+                patch.object(self.p, "_count_elements", return_value=3):
+            results = self.p.results
+            components = list(results)
+            self.assertEquals(results, components)
+            self.assertNotEquals(results, components[:2])
+            self.assertEquals(results + ["more"], components + ["more"])
+            self.assertEquals(["first"] + results, ["first"] + components)
+            self.assertEquals(results.index(components[1]), 1)
+            self.assertEquals(results.count(components[2]), 1)
+            self.assertTrue(components[0] in results)
+
+
+class ComponentHandleTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(ComponentHandleTestCase, self).setUp()
+
+        class ResultComponent(Component):
+            def get_price(self):
+                return "price of %s" % self._index
+
+        self.p, self.ResultComponent = self.make_page(ResultComponent, "css=li.result")
+        self.els = [MagicMock() for i in range(3)]
+
+    def _handles(self):
+        with patch.object(self.p, "get_reference_elements", return_value=self.els):
+            return self.p.results.handles()
+
+    def test_handles_are_compact(self):
+        with patch.object(self.p, "_make_component") as make_component:
+            handles = self._handles()
+        self.assertEquals(make_component.call_count, 0)
+        self.assertEquals(len(handles), 3)
+        self.assertFalse(hasattr(handles[0], "__dict__"))
+        self.assertTrue(handles[2].reference_webelement is self.els[2])
+
+    def test_handle_materializes_on_use(self):
+        handle = self._handles()[1]
+        with patch.object(self.p, "_make_component", wraps=self.p._make_component) as make_component:
+            self.assertEquals(handle.get_price(), "price of 1")
+            self.assertEquals(handle.get_price(), "price of 1")
+        self.assertEquals(make_component.call_count, 1)
+        self.assertTrue(isinstance(handle.materialize(), self.ResultComponent))
+
+    def test_handles_compare_by_element(self):
+        first, second = self._handles(), self._handles()
+        self.assertEquals(first, second)
+        self.assertEquals(set(first), set(second))
+        self.assertNotEquals(first[0], first[1])
+
+
+class PaginatedComponentsTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(PaginatedComponentsTestCase, self).setUp()
+        self.p, self.ResultComponent = self.make_page("ResultComponent", "css=li.result",
+                                                      selectors={"next": "css=a.next"})
+        self.pages = [[MagicMock() for i in range(3)] for j in range(3)]
+        self.current = 0
+        self.next_link = MagicMock()
+        self.next_link.click.side_effect = self._click
+
+        for name in ("get_reference_elements", "_count_elements", "_element_find", "wait_for"):
+            setattr(self, name, self.start_patch(self.p, name))
+        self.get_reference_elements.side_effect = lambda locator: self.pages[self.current]
+        self._count_elements.side_effect = lambda locator: len(self.pages[self.current])
+        self._element_find.side_effect = self._find
+
+    def _click(self):
+        self.current += 1
+
+    def _find(self, locator, first_only, required, **kwargs):
+        if locator == "next":
+            return self.next_link if self.current < len(self.pages) - 1 else None
+        return self.pages[self.current][0]
+
+    def test_iterates_across_pages(self):
+        results = list(self.p.iter_components(self.ResultComponent, "next"))
+        self.assertEquals([r.reference_webelement for r in results], sum(self.pages, []))
+        self.assertEquals(self.next_link.click.call_count, 2)
+        self.assertEquals(self.wait_for.call_count, 2)
+
+    def test_stops_at_limit(self):
+        results = list(self.p.iter_components(self.ResultComponent, "next", limit=4))
+        self.assertEquals(len(results), 4)
+        self.assertEquals(self.next_link.click.call_count, 1)
+
+    def test_stops_at_max_pages(self):
+        results = list(self.p.iter_components(self.ResultComponent, "next", max_pages=1))
+        self.assertEquals(len(results), 3)
+        self.assertEquals(self.next_link.click.call_count, 0)
+
+    def test_next_page_callable(self):
+        def next_page():
+            if self.current < 1:
+                self._click()
+                return True
+            return False
+        results = list(self.p.iter_components(self.ResultComponent, next_page))
+        self.assertEquals(len(results), 6)
+
+    def test_page_without_components(self):
+        self.pages = [[]]
+        self.get_reference_elements.side_effect = ValueError("Element locator 'css=li.result' did not match any elements.")
+        self._element_find.side_effect = lambda locator, first_only, required, **kwargs: None
+        self.assertEquals(list(self.p.iter_components(self.ResultComponent, "next")), [])
+
+    def test_stops_at_empty_page(self):
+        self.pages[1] = []
+        results = list(self.p.iter_components(self.ResultComponent, "next"))
+        self.assertEquals(len(results), 3)
+        self.assertEquals(self.next_link.click.call_count, 1)
+
+    def test_list_rendered_again_in_place(self):
+        # The same elements show each page's results.
+        self.pages = [self.pages[0]] * 3
+        self.pages[0][0].get_attribute.side_effect = lambda name: "<li>result %s</li>" % self.current
+        self.wait_for.side_effect = lambda loaded, **kwargs: self.assertTrue(loaded())
+        results = list(self.p.iter_components(self.ResultComponent, "next"))
+        self.assertEquals(len(results), 9)
+        self.assertEquals(self.next_link.click.call_count, 2)
+
+    def test_loaded_callable(self):
+        loaded = MagicMock(return_value=True)
+        self.wait_for.side_effect = lambda condition, **kwargs: condition()
+        list(self.p.iter_components(self.ResultComponent, "next", loaded=loaded))
+        self.assertEquals(loaded.call_count, 2)
+
+    def test_snapshots_one_call_per_page(self):
+        with patch.object(self.p, "_execute_on_root", side_effect=lambda *args: [{"n": self.current}] * 3) as run:
+            records = list(self.p.iter_components(self.ResultComponent, "next", fields={"title": "css=.title"}))
+        self.assertEquals(records, [{"n": 0}] * 3 + [{"n": 1}] * 3 + [{"n": 2}] * 3)
+        self.assertEquals(run.call_count, 3)
+        self.assertEquals(self.get_reference_elements.call_count, 0)
+
+
+class TrackedComponentsTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(TrackedComponentsTestCase, self).setUp()
+
+        class ItemComponent(Component):
+            selectors = {"headline": "css=h2"}
+
+        self.p = self.make_page(ItemComponent, "css=.feed .item")[0]
+        self.els = dict((key, MagicMock()) for key in "abcd")
+
+    def test_refresh_builds_only_changed_components(self):
+        feed = self.p.items.track("@data-id")
+        with patch.object(self.p, "_execute_on_root") as execute_on_root:
+            execute_on_root.return_value = [[["a", self.els["a"]], ["b", self.els["b"]]], [], []]
+            added, removed = feed.refresh()
+            self.assertEquals([c.reference_webelement for c in added], [self.els["a"], self.els["b"]])
+            self.assertEquals(removed, [])
+            first_a = feed["a"]
+
+            execute_on_root.return_value = [[["c", self.els["c"]]], ["b"], []]
+            with patch.object(self.p, "_make_component", wraps=self.p._make_component) as make_component:
+                added, removed = feed.refresh()
+
+        self.assertEquals(make_component.call_count, 1)
+        self.assertEquals([c.reference_webelement for c in added], [self.els["c"]])
+        self.assertEquals([c.reference_webelement for c in removed], [self.els["b"]])
+        self.assertEquals(feed.keys(), ["a", "c"])
+        self.assertTrue(feed["a"] is first_a)
+        self.assertEquals(len(feed), 2)
+
+        script, known = execute_on_root.call_args[0]
+        self.assertEquals(sorted(known), ["a", "b"])
+        self.assertTrue("readAttribute(el, \"data-id\")" in script)
+        self.assertTrue("querySelectorAll(\".feed .item\")" in script)
+
+    def test_key_from_selector_text(self):
+        feed = self.p.items.track("headline")
+        with patch.object(self.p, "_execute_on_root", return_value=[[], [], []]) as execute_on_root:
+            feed.refresh()
+        self.assertTrue("querySelectorAll(\"h2\")" in execute_on_root.call_args[0][0])
+
+    def test_rerendered_item_is_rebound(self):
+        feed = self.p.items.track("@data-id")
+        new_a = MagicMock()
+        with patch.object(self.p, "_execute_on_root") as execute_on_root:
+            execute_on_root.return_value = [[["a", self.els["a"]]], [], []]
+            component = feed.refresh()[0][0]
+            execute_on_root.return_value = [[], [], [["a", new_a]]]
+            self.assertEquals(feed.refresh(), ([], []))
+        self.assertTrue(feed["a"] is component)
+        self.assertTrue(component.reference_webelement is new_a)
+        self.assertTrue("__rpoTrackedKey" in execute_on_root.call_args[0][0])
+
+    def test_stale_tracked_component_found_by_key(self):
+        feed = self.p.items.track("@data-id")
+        new_a = MagicMock()
+        with patch.object(self.p, "_execute_on_root", return_value=[[["a", self.els["a"]]], [], []]):
+            component = feed.refresh()[0][0]
+        with patch.object(self.p, "_execute_on_root", return_value=new_a) as execute_on_root:
+            self.assertTrue(component._refresh_reference_webelement())
+        self.assertTrue(component.reference_webelement is new_a)
+        self.assertEquals(execute_on_root.call_args[0][1], "a")
+        with patch.object(self.p, "_execute_on_root", return_value=None):
+            self.assertFalse(component._refresh_reference_webelement())
+
+
+class ConcurrentMapTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(ConcurrentMapTestCase, self).setUp()
+
+        class ResultComponent(Component):
+            @property
+            def price(self):
+                return self.driver.command_executor.execute("getElementText", {"id": self._index})
+
+            @property
+            def link(self):
+                return self.find_element("css=a", wait=1)
+
+            def get_title(self, prefix):
+                return "%s %s" % (prefix, self._index)
+
+        self.p = self.make_page(ResultComponent, "css=li.result")[0]
+        self.driver = self.start_patch(_BaseActions, "_current_browser", return_value=MagicMock()).return_value
+        self.connection = RemoteConnection("http://127.0.0.1:4444/wd/hub")
+        self.driver.command_executor = self.connection
+
+        self.start_patch(self.p, "get_reference_elements", return_value=[MagicMock() for i in range(20)])
+
+    def test_map_over_per_thread_connections(self):
+        used = []
+        lock = threading.Lock()
+
+        def execute(connection, command, params):
+            time.sleep(0.01)
+            with lock:
+                used.append(connection)
+            return "$%s.00" % params["id"]
+
+        with patch.object(RemoteConnection, "execute", execute):
+            prices = self.p.results.map("price", workers=4)
+
+        self.assertEquals(prices, ["$%s.00" % i for i in range(20)])
+        connections = set(used)
+        self.assertTrue(1 < len(connections) <= 4)
+        self.assertFalse(self.connection in connections)
+        self.assertTrue(all(c.keep_alive for c in connections))
+        self.assertTrue(self.driver.command_executor is self.connection)
+
+    def test_threads_get_their_own_executors(self):
+        self.driver.command_executor = PooledRemoteConnection("http://127.0.0.1:4444/wd/hub", pipelining=True)
+        used = []
+
+        def execute(connection, command, params):
+            used.append(connection)
+
+        with patch.object(RemoteConnection, "execute", execute):
+            self.p.results.map("price", workers=4)
+        self.assertTrue(used)
+        for connection in used:
+            self.assertTrue(isinstance(connection, PooledRemoteConnection))
+            self.assertTrue(connection is not self.driver.command_executor)
+            self.assertFalse(connection.pipelining)
+
+    def test_threads_leave_implicit_wait_alone(self):
+        self.driver.execute_script.return_value = [MagicMock()]
+        self.p.results.map("link", workers=4)
+        self.assertEquals(self.driver.implicitly_wait.call_args_list, [((0,), {}), ((10,), {})])
+
+    def test_map_method_with_args(self):
+        self.assertEquals(self.p.results.map("get_title", "Result", workers=3)[:2], ["Result 0", "Result 1"])
+
+    def test_map_method_with_args_and_default_workers(self):
+        with patch("robotpageobjects.componentcollection.ThreadPool", wraps=ThreadPool) as thread_pool:
+            self.assertEquals(self.p.results.map("get_title", "Result")[-1], "Result 19")
+        thread_pool.assert_called_once_with(8)
+
+    def test_map_callable_serially(self):
+        self.assertEquals(self.p.results.map(lambda c: c._index, workers=1), range(20))
+
+
+class SnapshotTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(SnapshotTestCase, self).setUp()
+
+        class ResultComponent(Component):
+            selectors = {"price": "css=.price", "title": "css=a.title"}
+
+        self.p = self.make_page(ResultComponent, "css=li.result")[0]
+        self.fields = {"price": "price", "url": ("title", "href"), "id": (None, "data-id")}
+
+    def test_component_snapshot_in_one_call(self):
+        result = self.p._make_component(self.p.components.keys()[0], MagicMock(), "css=li.result", 0)
+        with patch.object(result, "_current_browser", return_value=MagicMock()) as current_browser:
+            current_browser.return_value.execute_script.return_value = {"price": "$14.00"}
+            self.assertEquals(result.snapshot(self.fields), {"price": "$14.00"})
+        execute_script = current_browser.return_value.execute_script
+        self.assertEquals(execute_script.call_count, 1)
+        script = execute_script.call_args[0][0]
+        self.assertTrue("querySelectorAll(\".price\")" in script)
+        self.assertTrue("readAttribute(el, \"data-id\")" in script)
+        self.assertTrue(execute_script.call_args[0][1] is result.reference_webelement)
+
+    def test_collection_snapshot_in_one_call(self):
+        records = [{"price": "$%s.00" % i} for i in range(100)]
+        with patch.object(self.p, "_execute_on_root", return_value=records) as execute_on_root:
+            with patch.object(self.p, "get_reference_elements") as get_reference_elements:
+                self.assertEquals(self.p.results.snapshot(self.fields), records)
+        self.assertEquals(execute_on_root.call_count, 1)
+        self.assertTrue("querySelectorAll(\"li.result\")" in execute_on_root.call_args[0][0])
+        self.assertEquals(get_reference_elements.call_count, 0)
+
+    def test_collection_snapshot_of_found_elements(self):
+        els = [MagicMock(), MagicMock()]
+        results = self.p.results
+        with patch.object(self.p, "get_reference_elements", return_value=els):
+            results[0]
+        with patch.object(self.p, "_execute_on_root", return_value=[{}, {}]) as execute_on_root:
+            results.snapshot(["price"])
+        self.assertEquals(execute_on_root.call_args[0][1], els)
+
+    @raises(ValueError)
+    def test_snapshot_locator_not_scriptable(self):
+        self.p.results.snapshot({"price": "link=Price"})
+
+
+class DomLocatorCacheTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(DomLocatorCacheTestCase, self).setUp()
+        os.environ["PO_CACHE_DOM_LOCATORS"] = "true"
+
+        self.p = self.make_page("ResultComponent", "dom=window.jQuery('#results li.result')")[0]
+        self.els = [MagicMock(), MagicMock()]
+        self.driver = self.start_patch(Page, "_current_browser", return_value=MagicMock()).return_value
+
+    def test_cached_until_dom_changes(self):
+        expression = "window.jQuery('#results li.result')"
+        self.driver.execute_script.side_effect = [["doc", 0, self.els], None, ["doc", 3, self.els[:1]]]
+        self.assertEquals(len(self.p.get_instances(self.p.components.keys()[0])), 2)
+        self.assertEquals(len(self.p.results), 2)
+        self.assertEquals(len(self.p.get_reference_elements("dom=" + expression)), 1)
+
+        calls = self.driver.execute_script.call_args_list
+        self.assertEquals([c[0][1:] for c in calls], [(None, None), ("doc", 0), ("doc", 0)])
+        self.assertTrue(expression in calls[0][0][0])
+        self.assertEquals(self.p.get_dom_locator_evaluations(), {expression: 2})
+
+    def test_components_share_cache(self):
+        self.driver.execute_script.return_value = ["doc", 0, self.els]
+        component = self.p.results[0]
+        self.assertTrue(component._dom_cache is self.p._dom_cache)
+
+    @raises(ValueError)
+    def test_required_not_found(self):
+        self.driver.execute_script.return_value = ["doc", 0, None]
+        self.p._element_find("dom=document.getElementById('nope')", True, True)
+
+    def test_find_elements(self):
+        self.driver.execute_script.return_value = ["doc", 0, self.els]
+        self.assertEquals(self.p.find_elements("dom=document.querySelectorAll('li')"), self.els)
+
+    def test_find_element(self):
+        self.driver.execute_script.return_value = ["doc", 0, self.els[:1]]
+        self.assertEquals(self.p.find_element("dom=document.getElementById('search')"), self.els[0])
+
+    @raises(exceptions.SelectorError)
+    def test_find_element_more_than_one(self):
+        self.driver.execute_script.return_value = ["doc", 0, self.els]
+        self.p.find_element("dom=document.querySelectorAll('li')")
+
+    def test_find_elements_not_required(self):
+        self.driver.execute_script.return_value = ["doc", 0, None]
+        self.assertEquals(self.p.find_elements("dom=document.getElementById('nope')", required=False), [])
+
+    def test_not_cached_by_default(self):
+        del os.environ["PO_CACHE_DOM_LOCATORS"]
+        self.assertEquals(Page()._dom_cache, None)
+
+
+class BrowserPoolTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(BrowserPoolTestCase, self).setUp()
+        os.environ["PO_BROWSER_POOL_SIZE"] = "1"
+        os.environ["PO_BROWSER_POOL_MAX_USES"] = "2"
+        self.addCleanup(Context.set_browser_pool, None)
+        self.created = []
+        self.start_patch(Page, "_get_browser_creation_function", return_value=self._create)
+
+    def _create(self, remote, desired_capabilities, profile_dir):
+        browser = MagicMock()
+        browser.window_handles = ["main", "popup"]
+        self.created.append(browser)
+        return browser
+
+    def _open(self, remote=None):
+        p = Page()
+        p._cache.register(p._make_browser("phantomjs", remote=remote), None)
+        return p
+
+    def test_closed_browser_reused_after_reset(self):
+        p = self._open()
+        browser = self.created[0]
+        p.close()
+        self.assertEquals(browser.quit.call_count, 0)
+        browser.close.assert_called_once_with()
+        browser.delete_all_cookies.assert_called_once_with()
+        browser.get.assert_called_with("about:blank")
+        self.assertFalse(p._cache.current)
+        self.assertEquals(p._cache.current_index, None)
+        self.assertEquals(p._cache.get_open_browsers(), [])
+
+        p = self._open()
+        self.assertEquals(len(self.created), 1)
+        self.assertTrue(p.driver is browser)
+
+    def test_close_all_browsers_after_reuse(self):
+        del os.environ["PO_BROWSER_POOL_MAX_USES"]
+        self._open().close()
+        p = self._open()
+        browser = self.created[0]
+        p.close_all_browsers()
+        self.assertEquals(browser.quit.call_count, 0)
+        self.assertEquals(browser.close.call_count, 2)
+        self.assertEquals(p._browser_pool.get_idle_count(), 1)
+        self.assertFalse(p._cache.browsers)
+
+    def test_close_all_browsers_quits_unpooled(self):
+        p = self._open()
+        other = self._create(None, None, None)
+        p._cache.register(other, None)
+        p.close_all_browsers()
+        self.assertEquals(other.quit.call_count, 1)
+        self.assertEquals(self.created[0].quit.call_count, 0)
+
+    def test_browser_recycled_after_max_uses(self):
+        for i in range(3):
+            self._open().close()
+        self.assertEquals(len(self.created), 2)
+        self.assertEquals(self.created[0].quit.call_count, 1)
+        self.assertEquals(self.created[1].quit.call_count, 0)
+
+    def test_pool_size_limits_idle_browsers(self):
+        pool = BrowserPool(1)
+        browsers = [self._create(None, None, None) for i in range(2)]
+        for browser in browsers:
+            pool.track("phantomjs", browser)
+        self.assertEquals([pool.checkin(browser) for browser in browsers], [True, False])
+        self.assertEquals(pool.get_idle_count(), 1)
+        self.assertEquals(browsers[1].quit.call_count, 1)
+
+    def test_remote_browsers_not_pooled(self):
+        self._open(remote="http://example.com/wd/hub").close()
+        self.assertEquals(self.created[0].quit.call_count, 1)
+
+    def test_no_pool_by_default(self):
+        del os.environ["PO_BROWSER_POOL_SIZE"]
+        self._open().close()
+        self.assertEquals(self.created[0].quit.call_count, 1)
+
+
+class PrelaunchBrowserTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(PrelaunchBrowserTestCase, self).setUp()
+        os.environ["PO_PRELAUNCH_BROWSER"] = "true"
+        self.addCleanup(Context.set_browser_pool, None)
+        self.launched_in = []
+        self.start_patch(Page, "_get_browser_creation_function", return_value=self._create)
+
+    def _create(self, remote, desired_capabilities, profile_dir):
+        time.sleep(0.05)
+        self.launched_in.append(threading.current_thread().name)
+        return MagicMock()
+
+    def test_open_picks_up_prelaunched_browser(self):
+        p = Page()
+        self.assertEquals(self.launched_in, [])
+        browser = p._make_browser("phantomjs")
+        self.assertEquals(self.launched_in, ["robotpageobjects-prelaunch-phantomjs"])
+        self.assertTrue(Context.get_browser_pool().is_tracked(browser))
+
+        # Without browser_pool_size, the browser isn't kept when closed.
+        p._cache.register(browser, None)
+        p.close()
+        self.assertEquals(browser.quit.call_count, 1)
+
+    def test_one_prelaunch_at_a_time(self):
+        Page()
+        with patch.object(Page, "_get_browser_creation_function") as get_browser_creation_function:
+            Page()
+        self.assertEquals(get_browser_creation_function.call_count, 0)
+        Page()._make_browser("phantomjs")
+        self.assertEquals(len(self.launched_in), 1)
+
+    def test_no_prelaunch_when_reusing_session(self):
+        os.environ["PO_REUSE_SESSION"] = "true"
+        Page()
+        self.assertFalse(Context.get_browser_pool().is_launching("phantomjs"))
+
+    def test_failed_prelaunch_falls_back(self):
+        calls = []
+
+        def create(remote, desired_capabilities, profile_dir):
+            calls.append(threading.current_thread().name)
+            if len(calls) == 1:
+                raise WebDriverException("port in use")
+            return MagicMock()
+
+        with patch.object(Page, "_get_browser_creation_function", return_value=create):
+            browser = Page()._make_browser("phantomjs")
+        self.assertEquals(len(calls), 2)
+        self.assertTrue(isinstance(browser, MagicMock))
+
+
+class DriverLauncherTestCase(BaseTestCase):
+
+    class FakeDriver(object):
+        def __init__(self, port=0, service_args=None):
+            self.port = port
+            self.service = MagicMock()
+            self.launches.append(self)
+            if len(self.launches) <= self.failures:
+                raise WebDriverException("Can not connect to the Service phantomjs")
+
+        def execute_script(self, script):
+            return self.health
+
+        def quit(self):
+            self.service.stop()
+
+    def setUp(self):
+        super(DriverLauncherTestCase, self).setUp()
+        DriverLauncher.reset_history()
+        self.addCleanup(DriverLauncher.reset_history)
+        self.FakeDriver.launches = []
+        self.FakeDriver.failures = 2
+        self.FakeDriver.health = 1
+        self.sleeps = []
+        self.launcher = DriverLauncher(attempts=4, sleep=self.sleeps.append)
+        # Without jitter, so backoffs can be compared.
+        self.launcher.jitter = 0
+
+    def test_retries_on_new_ports_with_backoff(self):
+        driver = self.launcher.launch(self.FakeDriver, service_args=["--ignore-ssl-errors=yes"], profile=None)
+        launches = self.FakeDriver.launches
+        self.assertTrue(driver is launches[2])
+        self.assertEquals(len(set(d.port for d in launches)), 3)
+        self.assertTrue(all(d.port for d in launches))
+        self.assertEquals(len(self.sleeps), 2)
+        self.assertTrue(self.sleeps[0] < self.sleeps[1])
+
+        # Half-started drivers have their service processes stopped.
+        self.assertEquals([d.service.stop.call_count for d in launches], [1, 1, 0])
+
+        record = DriverLauncher.get_history()[0]
+        self.assertTrue(record["succeeded"])
+        self.assertEquals(record["attempts"], 3)
+        self.assertEquals(len(record["errors"]), 2)
+        self.assertTrue("Can not connect" in record["errors"][0])
+        self.assertTrue("1 launches, 0 failed, 1 needed retries." in DriverLauncher.format_summary())
+
+    def test_log_launch_summary(self):
+        self.launcher.launch(self.FakeDriver)
+        p = Page()
+        with patch.object(Page, "log") as log:
+            self.assertTrue(p.log_browser_launch_summary() is p)
+        log.assert_called_once_with(DriverLauncher.format_summary(), "INFO")
+
+    def test_health_check_failure_retried(self):
+        self.FakeDriver.failures = 0
+        self.FakeDriver.health = None
+        self.assertRaises(WebDriverException, self.launcher.launch, self.FakeDriver)
+        self.assertEquals(len(self.FakeDriver.launches), 4)
+        self.assertTrue(all(d.service.stop.call_count == 1 for d in self.FakeDriver.launches))
+        self.assertFalse(DriverLauncher.get_history()[0]["succeeded"])
+
+    def test_non_transient_error_not_retried(self):
+        class BadDriver(object):
+            def __init__(self, desired_capabilities=None):
+                raise ValueError("bad capabilities")
+
+        self.assertRaises(ValueError, self.launcher.launch, BadDriver)
+        self.assertEquals(self.sleeps, [])
+
+    def test_session_not_created_not_retried(self):
+        class FullDriver(object):
+            def __init__(self, desired_capabilities=None):
+                raise SessionNotCreatedException("Unable to create session: unsupported platform")
+
+        self.assertRaises(SessionNotCreatedException, self.launcher.launch, FullDriver)
+        self.assertEquals(self.sleeps, [])
+
+    def test_refused_connection_retried(self):
+        class RefusedDriver(self.FakeDriver):
+            def __init__(self, port=0):
+                super(RefusedDriver, self).__init__(port)
+
+            def execute_script(self, script):
+                if len(self.launches) < 2:
+                    raise socket.error(errno.ECONNREFUSED, "Connection refused")
+                return 1
+
+        self.FakeDriver.failures = 0
+        self.assertTrue(self.launcher.launch(RefusedDriver) is self.FakeDriver.launches[1])
+        self.assertEquals(len(DriverLauncher.get_history()[0]["errors"]), 1)
+
+    def test_page_launches_browsers_through_launcher(self):
+        os.environ["PO_BROWSER_LAUNCH_ATTEMPTS"] = "2"
+        with patch.object(DriverLauncher, "launch", return_value=MagicMock()) as launch:
+            Page()._make_browser("phantomjs")
+        launch.assert_called_once_with(webdriver.PhantomJS, service_args=[])
+
+
+class FilteringProxyTestCase(FixtureTestCase):
+
+    class OriginHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+        types = {".html": "text/html", ".png": "image/png", ".js": "application/javascript; charset=utf-8"}
+
+        def do_GET(self):
+            body = "content of %s" % self.path
+            self.send_response(200)
+            self.send_header("Content-Type", self.types[os.path.splitext(self.path)[1]])
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.path.startswith("/slow/"):
+                self.wfile.flush()
+                time.sleep(2)
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    def setUp(self):
+        super(FilteringProxyTestCase, self).setUp()
+        self.origin_server = self.start_server(self.OriginHandler)
+        self.origin = self.origin_server.url
+
+        self.proxy = FilteringProxy(blocked_urls=["*/ads/*"], blocked_content_types=["image/*"],
+                                    allowed_urls=["*/ads/keep.js"])
+        self.proxy.start()
+        self.addCleanup(self.proxy.stop)
+        self.opener = urllib2.build_opener(urllib2.ProxyHandler({"http": self.proxy.address}))
+
+    def get(self, path):
+        resp = self.opener.open(self.origin + path)
+        return resp.getcode(), resp.info().gettype(), resp.read()
+
+    def test_passes_through(self):
+        self.assertEquals(self.get("/index.html"), (200, "text/html", "content of /index.html"))
+
+    def test_blocks_by_url(self):
+        self.assertEquals(self.get("/ads/banner.js")[::2], (204, ""))
+        self.assertEquals(self.get("/ads/keep.js")[2], "content of /ads/keep.js")
+
+    def test_blocks_by_content_type(self):
+        self.assertEquals(self.get("/logo.png"), (200, "image/png", ""))
+        self.assertEquals((self.proxy.stats["requests"], self.proxy.stats["blocked"]), (1, 1))
+
+    def test_blocked_content_type_dropped_before_body(self):
+        start = time.time()
+        self.assertEquals(self.get("/slow/photo.png"), (200, "image/png", ""))
+        self.assertTrue(time.time() - start < 1.5)
+
+    def test_rules_can_change(self):
+        self.proxy.set_rules()
+        self.assertEquals(self.get("/logo.png")[2], "content of /logo.png")
+
+    def test_record_then_replay(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "archive.dat")
+
+        self.proxy.set_archive(ReplayArchive(path), "record")
+        self.assertEquals(self.get("/index.html")[2], "content of /index.html")
+        self.assertEquals(self.get("/app.js")[2], "content of /app.js")
+        # Blocked responses are recorded too, so the archive doesn't depend on the rules.
+        self.get("/logo.png")
+        self.proxy.set_archive(None, None)
+        self.assertEquals(len(ReplayArchive(path)), 3)
+
+        # Replay works without the origin server.
+        self.origin_server.server_close()
+        self.proxy.set_archive(ReplayArchive(path), "replay")
+        self.assertRaises(urllib2.HTTPError, self.get, "/other.html")
+        self.proxy.set_rules()
+        self.assertEquals(self.get("/app.js"), (200, "application/javascript", "content of /app.js"))
+        self.assertEquals(self.get("/logo.png")[2], "content of /logo.png")
+        self.assertEquals(self.proxy.stats["replayed"], 2)
+        self.assertEquals(self.proxy.stats["missed"], 1)
+
+    def test_replay_mode_option(self):
+        os.environ["PO_REPLAY_MODE"] = "rewind"
+        self.assertRaises(ValueError, Page)
+
+    def test_page_wires_browsers_to_proxy(self):
+        os.environ["PO_BASEURL"] = self.origin
+        os.environ["PO_BLOCKED_CONTENT_TYPES"] = "font/*"
+        Context.set_proxy(self.proxy)
+        self.addCleanup(Context.set_proxy, None)
+
+        class BlockingPage(Page):
+            uri = "/"
+            blocked_urls = ["*.png"]
+
+        p = BlockingPage()
+        self.assertEquals(p.blocked_urls, ["*.png"])
+        self.assertEquals(p.blocked_content_types, ["font/*"])
+
+        with patch.object(DriverLauncher, "launch", return_value=MagicMock()) as launch:
+            p._make_browser("phantomjs")
+            p._make_browser("chrome")
+        self.assertEquals(launch.call_args_list[0][1]["service_args"],
+                          ["--proxy=%s" % self.proxy.address, "--proxy-type=http"])
+        caps = launch.call_args_list[1][1]["desired_capabilities"]
+        self.assertEquals(caps["proxy"]["httpProxy"], self.proxy.address)
+        self.assertEquals(caps["browserName"], "chrome")
+
+        with patch.object(p, "open_browser"), patch.object(p, "get_current_browser"):
+            p.open()
+        self.assertEquals(self.proxy.blocked_urls, ["*.png"])
+        self.assertEquals(self.get("/logo.png")[0], 204)
+
+
+class NavigationElisionTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(NavigationElisionTestCase, self).setUp()
+        os.environ["PO_BASEURL"] = "http://Example.com"
+        os.environ["PO_ELIDE_NAVIGATION"] = "true"
+        self.p = Page()
+        self.browser = MagicMock()
+        self.browser.execute_script.return_value = ["complete", "http://example.com/"]
+        self.p._cache.register(self.browser, None)
+        self.addCleanup(self.p._cache.empty_cache)
+        self.open_browser = self.start_patch(self.p, "open_browser")
+
+    def test_skips_navigation_to_current_url(self):
+        self.p.open()
+        self.p.go_to("/")
+        self.assertFalse(self.open_browser.called)
+        self.assertFalse(self.browser.get.called)
+        self.assertEquals(self.p.get_navigations_skipped(), 2)
+
+    def test_navigates_elsewhere_or_while_loading(self):
+        with patch.object(self.p, "_install_browser_error_sentinel"):
+            self.p.go_to("/other")
+            self.browser.execute_script.return_value = ["loading", "http://example.com/"]
+            self.p.open()
+        self.browser.get.assert_called_once_with("http://Example.com/other")
+        self.assertTrue(self.open_browser.called)
+        self.assertEquals(self.p.get_navigations_skipped(), 0)
+
+    def test_identity_selector(self):
+        self.p.identity_selector = "css=#home"
+        with patch.object(self.p, "_element_find", return_value=None) as find, \
+                patch.object(self.p, "_install_browser_error_sentinel"):
+            self.p.open()
+        find.assert_called_once_with("css=#home", True, False, wait=0)
+        self.assertTrue(self.open_browser.called)
+
+    def test_off_by_default(self):
+        del os.environ["PO_ELIDE_NAVIGATION"]
+        p = Page()
+        with patch.object(p, "open_browser") as open_browser, \
+                patch.object(p, "_install_browser_error_sentinel"), patch.object(p, "get_current_browser"):
+            p.open()
+        self.assertTrue(open_browser.called)
+
+
+class PageLoadStrategyTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(PageLoadStrategyTestCase, self).setUp()
+        os.environ["PO_PAGE_LOAD_STRATEGY"] = "eager"
+        os.environ["PO_PAGE_LOAD_TIMEOUT"] = "7.5"
+        self.launch = self.start_patch(DriverLauncher, "launch", return_value=MagicMock())
+
+    def test_local_browser(self):
+        browser = Page()._make_browser("chrome")
+        caps = self.launch.call_args[1]["desired_capabilities"]
+        self.assertEquals(caps["pageLoadStrategy"], "eager")
+        self.assertEquals(caps["browserName"], "chrome")
+        browser.set_page_load_timeout.assert_called_once_with(7.5)
+        # The shared capabilities aren't changed.
+        self.assertFalse("pageLoadStrategy" in webdriver.DesiredCapabilities.CHROME)
+
+    def test_timeout_as_time_string(self):
+        os.environ["PO_PAGE_LOAD_TIMEOUT"] = "1 minute 30 seconds"
+        browser = Page()._make_browser("chrome")
+        browser.set_page_load_timeout.assert_called_once_with(90)
+
+    def test_remote_browser(self):
+        Page()._make_browser("firefox", {"platform": "Linux"}, remote="http://localhost:4444/wd/hub")
+        caps = self.launch.call_args[1]["desired_capabilities"]
+        self.assertEquals((caps["pageLoadStrategy"], caps["platform"]), ("eager", "Linux"))
+
+    def test_not_set(self):
+        del os.environ["PO_PAGE_LOAD_STRATEGY"]
+        del os.environ["PO_PAGE_LOAD_TIMEOUT"]
+        browser = Page()._make_browser("phantomjs")
+        self.launch.assert_called_once_with(webdriver.PhantomJS, service_args=[])
+        self.assertFalse(browser.set_page_load_timeout.called)
+
+    @raises(ValueError)
+    def test_invalid_strategy(self):
+        os.environ["PO_PAGE_LOAD_STRATEGY"] = "fast"
+        Page()
+
+
+class ReuseSessionTestCase(FixtureTestCase):
+
+    class DriverHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+        # Stands in for a driver with one live session.
+        live_session = "live-session"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path.startswith("/session/%s/" % self.live_session):
+                code, body = 200, {"sessionId": self.live_session, "status": 0, "value": 1}
+            else:
+                code, body = 404, {"status": 6, "value": {"message": "invalid session id"}}
+            body = json.dumps(body)
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_DELETE(self):
+            self.quit_sessions.append(self.path.rsplit("/", 1)[-1])
+            body = json.dumps({"sessionId": self.live_session, "status": 0, "value": None})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    def setUp(self):
+        super(ReuseSessionTestCase, self).setUp()
+        self.DriverHandler.quit_sessions = []
+        self.executor_url = self.start_server(self.DriverHandler).url
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.state_file = os.path.join(tmp_dir, "session.json")
+        os.environ["PO_REUSE_SESSION"] = "true"
+        os.environ["PO_SESSION_STATE_FILE"] = self.state_file
+
+        self.created = []
+        self.drivers = []
+        self.start_patch(Page, "_get_browser_creation_function", return_value=self._create)
+
+    def _create(self, remote, desired_capabilities, profile_dir):
+        browser = MagicMock()
+        browser.session_id = self.DriverHandler.live_session
+        browser.command_executor._url = self.executor_url
+        browser.capabilities = {"browserName": "phantomjs"}
+        browser.w3c = False
+        # Stands in for the local driver process.
+        driver = subprocess.Popen(["sleep", "30"])
+        self.addCleanup(lambda: driver.poll() is None and driver.kill())
+        browser.service.process = driver
+        browser.service.path = "sleep"
+        self.drivers.append(driver)
+        self.created.append(browser)
+        return browser
+
+    def test_attaches_to_recorded_session(self):
+        browser = Page()._make_browser("phantomjs")
+        self.assertEquals(browser.service.process, None)
+        with open(self.state_file) as f:
+            self.assertEquals(json.load(f)["session_id"], "live-session")
+
+        attached = Page()._make_browser("phantomjs")
+        self.assertEquals(len(self.created), 1)
+        self.assertTrue(isinstance(attached, AttachedRemote))
+        self.assertEquals(attached.session_id, "live-session")
+        self.assertEquals(attached.capabilities, {"browserName": "phantomjs"})
+
+        # Another browser type doesn't attach.
+        Page()._make_browser("chrome")
+        self.assertEquals(len(self.created), 2)
+
+    def test_dead_session_falls_back(self):
+        Page()._make_browser("phantomjs")
+        self.DriverHandler.live_session = "new-session"
+        self.addCleanup(setattr, self.DriverHandler, "live_session", "live-session")
+        browser = Page()._make_browser("phantomjs")
+        self.assertEquals(len(self.created), 2)
+        self.assertTrue(browser is self.created[1])
+        with open(self.state_file) as f:
+            self.assertEquals(json.load(f)["session_id"], "new-session")
+
+    def test_close_leaves_browser_open(self):
+        p = Page()
+        browser = p._make_browser("phantomjs")
+        p._cache.register(browser, None)
+        p.close()
+        self.assertFalse(browser.quit.called)
+        self.assertFalse(p._cache)
+
+    def test_quit_reused_session(self):
+        p = Page()
+        browser = p._make_browser("phantomjs")
+        driver = self.drivers[0]
+        p._cache.register(browser, None)
+        p.quit_reused_session()
+        self.assertEquals(self.DriverHandler.quit_sessions, ["live-session"])
+        self.assertEquals(driver.wait(), -signal.SIGTERM)
+        self.assertFalse(os.path.exists(self.state_file))
+        self.assertFalse(p._cache)
+
+        # Nothing to quit anymore.
+        p.quit_reused_session()
+        self.assertEquals(self.DriverHandler.quit_sessions, ["live-session"])
+
+    def test_dead_session_stops_driver(self):
+        Page()._make_browser("phantomjs")
+        driver = self.drivers[0]
+        self.DriverHandler.live_session = "new-session"
+        self.addCleanup(setattr, self.DriverHandler, "live_session", "live-session")
+        Page()._make_browser("phantomjs")
+        self.assertEquals(driver.wait(), -signal.SIGTERM)
+
+    def test_relative_state_file_is_in_output_dir(self):
+        os.environ["PO_SESSION_STATE_FILE"] = "session.json"
+        output_dir = os.path.dirname(self.state_file)
+        with patch.object(Context, "get_output_dir", return_value=output_dir):
+            Page()._make_browser("phantomjs")
+        self.assertTrue(os.path.exists(self.state_file))
+
+
+class PooledRemoteConnectionTestCase(FixtureTestCase):
+
+    class HubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self.server.paths.append((self.command, self.path))
+            if "cookie" in self.path:
+                code, body = 500, {"sessionId": "s", "status": 13, "value": {"message": "no cookies here"}}
+            else:
+                code, body = 200, {"sessionId": "s", "status": 0, "value": self.path}
+            body = json.dumps(body)
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = do_DELETE = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    def setUp(self):
+        super(PooledRemoteConnectionTestCase, self).setUp()
+        # Threaded, since connections are kept open.
+        server = self.start_server(self.HubHandler, threaded=True)
+        server.paths = self.paths = []
+        self.url = server.url + "/wd/hub"
+
+    def test_reuses_connection(self):
+        conn = PooledRemoteConnection(self.url)
+        for i in range(3):
+            self.assertEquals(conn.execute(Command.GET_CURRENT_URL, {"sessionId": "s"})["value"],
+                              "/wd/hub/session/s/url")
+        self.assertEquals(conn.get_stats(), {"requests": 3, "connections": 1, "reused": 2, "pipelined": 0})
+
+    def test_pipelining_keeps_order(self):
+        conn = PooledRemoteConnection(self.url, pipelining=True)
+        self.assertEquals(conn.execute(Command.IMPLICIT_WAIT, {"sessionId": "s", "ms": 10})["status"], 0)
+        conn.execute(Command.SET_SCRIPT_TIMEOUT, {"sessionId": "s", "ms": 10})
+        conn.execute(Command.GET_TITLE, {"sessionId": "s"})
+        self.assertEquals([path for method, path in self.paths],
+                          ["/wd/hub/session/s/timeouts/implicit_wait", "/wd/hub/session/s/timeouts/async_script",
+                           "/wd/hub/session/s/title"])
+        self.assertEquals(conn.get_stats()["pipelined"], 2)
+
+    def test_pipelined_failure_raised_by_next_command(self):
+        conn = PooledRemoteConnection(self.url, pipelining=True)
+        conn.execute(Command.DELETE_ALL_COOKIES, {"sessionId": "s"})
+        self.assertRaises(WebDriverException, conn.execute, Command.GET_TITLE, {"sessionId": "s"})
+        self.assertEquals(len(self.paths), 1)
+        conn.execute(Command.GET_TITLE, {"sessionId": "s"})
+
+    def test_page_uses_pooled_connection_for_remote_browsers(self):
+        with patch.object(DriverLauncher, "launch", return_value=MagicMock()) as launch:
+            Page()._make_browser("firefox", remote=self.url)
+        executor = launch.call_args[1]["command_executor"]
+        self.assertTrue(isinstance(executor, PooledRemoteConnection))
+        self.assertFalse(executor.pipelining)
+
+
+class LocalHubTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(LocalHubTestCase, self).setUp()
+        self.driver_url = self.start_server(ReuseSessionTestCase.DriverHandler, threaded=True).url
+        self.launched = []
+
+    def _launch(self, webdriver_type, capabilities):
+        driver = MagicMock()
+        driver.session_id = "live-session"
+        driver.command_executor._url = self.driver_url
+        driver.capabilities = dict(capabilities, launchedAs=webdriver_type.__name__)
+        driver.w3c = False
+        self.launched.append(driver)
+        return driver
+
+    def start_hub(self, max_sessions=1, queue_timeout=600, idle_timeout=300):
+        hub = LocalHub(max_sessions, queue_timeout, launch=self._launch, idle_timeout=idle_timeout)
+        url = hub.start()
+        self.addCleanup(hub.stop)
+        return hub, url
+
+    def test_forwards_to_local_driver(self):
+        hub, url = self.start_hub()
+        driver = webdriver.Remote(command_executor=PooledRemoteConnection(url),
+                                  desired_capabilities={"browserName": "phantomjs"})
+        self.assertEquals(driver.session_id, "live-session")
+        self.assertEquals(driver.capabilities["launchedAs"], "WebDriver")
+        self.assertEquals(driver.execute_script("return 1;"), 1)
+        self.assertTrue(hub._sessions["live-session"][0].endswith("-%s" % os.getpid()))
+        self.assertEquals(hub.get_status()["sessions"], 1)
+
+        driver.quit()
+        self.assertEquals(self.launched[0].quit.call_count, 1)
+        self.assertEquals(hub.get_status()["sessions"], 0)
+
+    def test_queue_timeout(self):
+        hub, url = self.start_hub(queue_timeout=0.1)
+        webdriver.Remote(command_executor=url, desired_capabilities={"browserName": "chrome"})
+        self.assertRaises(WebDriverException, webdriver.Remote, command_executor=url,
+                          desired_capabilities={"browserName": "chrome"})
+        self.assertEquals(len(self.launched), 1)
+
+    def test_idle_sessions_reaped(self):
+        hub = LocalHub(2, launch=self._launch, idle_timeout=0.2)
+        hub.new_session("a", {"browserName": "chrome"})
+        time.sleep(0.15)
+        self.assertEquals(hub.reap_idle_sessions(), [])
+        hub.get_driver("live-session")
+        time.sleep(0.15)
+        self.assertEquals(hub.reap_idle_sessions(), [])
+        time.sleep(0.1)
+        self.assertEquals(hub.reap_idle_sessions(), ["live-session"])
+        self.assertEquals(self.launched[0].quit.call_count, 1)
+        self.assertEquals(hub.get_status()["sessions"], 0)
+
+    def test_orphaned_session_frees_slot(self):
+        hub, url = self.start_hub(queue_timeout=5, idle_timeout=0.2)
+        webdriver.Remote(command_executor=url, desired_capabilities={"browserName": "chrome"})
+        # The first session's client never deletes it, but the second request gets its slot.
+        webdriver.Remote(command_executor=url, desired_capabilities={"browserName": "chrome"})
+        self.assertEquals(len(self.launched), 2)
+        self.assertEquals(self.launched[0].quit.call_count, 1)
+
+    def test_unsupported_browser(self):
+        hub, url = self.start_hub()
+        self.assertRaises(WebDriverException, webdriver.Remote, command_executor=url,
+                          desired_capabilities={"browserName": "netscape"})
+        self.assertEquals(hub.get_status()["sessions"], 0)
+
+    def test_fair_share(self):
+        scheduler = SessionScheduler(2)
+        scheduler.acquire("a")
+        scheduler.acquire("a")
+        granted = []
+
+        def wait_for_slot(client):
+            scheduler.acquire(client, timeout=5)
+            granted.append(client)
+
+        threads = []
+        for i, client in enumerate(["a", "b"]):
+            threads.append(threading.Thread(target=wait_for_slot, args=(client,)))
+            threads[-1].start()
+            while scheduler.get_queued_count() < i + 1:
+                time.sleep(0.01)
+
+        # "a" asked first, but "b" has no sessions yet.
+        scheduler.release("a")
+        threads[1].join(5)
+        self.assertEquals(granted, ["b"])
+        scheduler.release("b")
+        threads[0].join(5)
+        self.assertEquals(granted, ["b", "a"])
+
+    def test_page_opens_at_remote_url(self):
+        os.environ["PO_BASEURL"] = "http://example.com"
+        os.environ["PO_REMOTE_URL"] = "http://localhost:4444/wd/hub"
+        p = Page()
+        with patch.object(p, "open_browser") as open_browser, patch.object(p, "get_current_browser"), \
+                patch.object(p, "_install_browser_error_sentinel"):
+            p.open()
+        open_browser.assert_called_once_with("http://example.com/", "phantomjs",
+                                             remote_url="http://localhost:4444/wd/hub")
+
+
+class TestTimeBudgetTestCase(BaseTestCase):
+
+    def setUp(self):
+        super(TestTimeBudgetTestCase, self).setUp()
+        self.addCleanup(Context.set_deadline, None)
+
+    def test_no_budget_leaves_timeout_alone(self):
+        self.assertEquals(Page()._get_budgeted_timeout(10), 10)
+
+    def test_keyword_limits_timeouts_to_remaining_budget(self):
+        p = Page()
+        p.set_test_time_budget("5 seconds")
+        self.assertTrue(4 < p._get_budgeted_timeout(10) <= 5)
+        self.assertEquals(p._get_budgeted_timeout(2), 2)
+
+    def test_exhausted_budget_gives_zero_timeout(self):
+        p = Page()
+        Context.set_deadline(time.time() - 1)
+        self.assertEquals(p._get_budgeted_timeout(10), 0)
+
+    def test_budget_from_option(self):
+        os.environ["PO_TEST_TIME_BUDGET"] = "3"
+        p = Page()
+        self.assertEquals(p.test_time_budget, 3)
+        self.assertTrue(2 < p._get_budgeted_timeout(10) <= 3)
+
+    def test_zero_removes_budget_from_option(self):
+        os.environ["PO_TEST_TIME_BUDGET"] = "3"
+        p = Page()
+        p.set_test_time_budget(0)
+        self.assertEquals(p._get_budgeted_timeout(10), 10)
+        p.set_test_time_budget(None)
+        self.assertEquals(p._get_budgeted_timeout(10), 10)
+
+    def test_budget_ends_with_test(self):
+        p = Page()
+        with patch("robotpageobjects.context.EXECUTION_CONTEXTS") as contexts:
+            contexts.current.test = "first"
+            p.set_test_time_budget("5 seconds")
+            self.assertTrue(p._get_budgeted_timeout(10) <= 5)
+            contexts.current.test = "second"
+            self.assertEquals(p._get_budgeted_timeout(10), 10)
+
+
+class BrowserErrorSentinelTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(BrowserErrorSentinelTestCase, self).setUp()
+        os.environ["PO_FAIL_ON_BROWSER_ERRORS"] = "true"
+        self.p = Page()
+        self.driver = MagicMock()
+        self.start_patch(Page, "_current_browser", return_value=self.driver)
+
+    def test_option(self):
+        self.assertTrue(self.p.fail_on_browser_errors)
+
+    def test_composed_wait_checks_errors_in_same_call(self):
+        self.driver.execute_script.return_value = [["JavaScript error: boom"], None]
+        try:
+            self.p.wait_for(url_contains("/results"), timeout=5)
+        except exceptions.BrowserSideError as e:
+            self.assertTrue("boom" in str(e))
+        else:
+            self.fail("BrowserSideError was not raised")
+        self.assertEquals(self.driver.execute_script.call_count, 1)
+
+    @raises(exceptions.BrowserSideError)
+    def test_find_stops_on_error(self):
+        self.driver.execute_script.return_value = [["HTTP 500 response to GET /api"], None]
+        start = time.time()
+        try:
+            self.p.find_element("css=#never", wait=10)
+        finally:
+            self.assertTrue(time.time() - start < 5)
+            self.assertEquals(self.driver.execute_script.call_count, 1)
+
+    def test_find_checks_errors_in_same_call(self):
+        element = MagicMock()
+        self.driver.execute_script.return_value = [[], [element]]
+        self.assertEquals(self.p.find_element("css=#foo", wait=10), element)
+        self.assertEquals(self.driver.execute_script.call_count, 1)
+        self.assertFalse(self.driver.find_elements_by_css_selector.called)
+
+    @raises(exceptions.BrowserSideError)
+    def test_find_without_js_finder_stops_on_error(self):
+        self.driver.find_elements_by_link_text.return_value = []
+        self.driver.execute_script.return_value = ["HTTP 500 response to GET /api"]
+        self.p.find_element("link=Never", wait=10)
+
+    def test_met_condition_is_not_checked(self):
+        self.p.wait_for(lambda: True, timeout=5)
+        self.assertFalse(self.driver.execute_script.called)
+
+    def test_open_alert_skips_check(self):
+        self.driver.execute_script.side_effect = UnexpectedAlertPresentException("Alert open")
+        conditions_met = iter([False, True])
+        self.p.wait_for(lambda: next(conditions_met), timeout=5)
+
+
+class WaitStatsTestCase(FixtureTestCase):
+
+    def setUp(self):
+        super(WaitStatsTestCase, self).setUp()
+        WaitStats.reset()
+        self.addCleanup(WaitStats.reset)
+        self.start_patch(WaitStats, "_report_path", "wait_report.txt")
+
+    def test_percentiles(self):
+        values = range(1, 101)
+        self.assertEquals(WaitStats.percentile(values, 50), 50)
+        self.assertEquals(WaitStats.percentile(values, 95), 95)
+        self.assertEquals(WaitStats.percentile(values, 99), 99)
+        self.assertIsNone(WaitStats.percentile([], 50))
+
+    def test_recommendation_never_raises_timeout(self):
+        self.assertEquals(WaitStats.recommend(10, 0.3), 1.0)
+        self.assertEquals(WaitStats.recommend(10, 1.2), 2.5)
+        self.assertEquals(WaitStats.recommend(2, 5), 2)
+        self.assertEquals(WaitStats.recommend(10, None), 10)
+
+    def test_summary(self):
+        for elapsed in (0.1, 0.2, 0.3):
+            WaitStats.record("MyPage", "search button", 10, elapsed, True)
+        WaitStats.record("MyPage", "search button", 10, 10, False)
+        row = WaitStats.get_summary()[0]
+        self.assertEquals((row["count"], row["timed_out"], row["p50"], row["p99"]), (4, 1, 0.2, 0.3))
+        self.assertTrue("search button" in WaitStats.format_report())
+
+    def test_report_per_process(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        WaitStats._report_path = os.path.join(tmp_dir, "waits.txt")
+        WaitStats.record("MyPage", "search button", 10, 0.1, True)
+        WaitStats._write_report_at_exit()
+        self.assertEquals(os.listdir(tmp_dir), ["waits.%s.txt" % os.getpid()])
+
+    def test_find_is_recorded(self):
+        p = Page()
+        driver = MagicMock()
+        driver.find_elements_by_css_selector.return_value = [MagicMock()]
+        with patch.object(Page, "_current_browser", return_value=driver):
+            p.find_element("css=#foo")
+        row = WaitStats.get_summary()[0]
+        self.assertEquals((row["page"], row["target"], row["timeout"]), ("Page", "css=#foo", 10))
+
+    def test_keyword_waits_are_recorded_by_what_they_wait_for(self):
+        p = Page()
+        driver = MagicMock()
+        element = MagicMock()
+        element.is_displayed.return_value = True
+        driver.find_elements_by_css_selector.return_value = [element]
+        driver.execute_script.return_value = True
+        with patch.object(Page, "_current_browser", return_value=driver):
+            p.wait_until_element_is_visible("css=#foo", 5)
+            p.wait_until_page_contains_element("css=#bar", 5)
+            p.wait_for_condition("return window.ready;", 5)
+        targets = sorted(row["target"] for row in WaitStats.get_summary())
+        self.assertEquals(targets, ["css=#bar", "css=#foo", "return window.ready;"])